@@ -0,0 +1,318 @@
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import providers
+from records import listing_records
+from singleflight import SingleFlight
+from spatial_index import SpatialIndex
+
+# Tile cache configuration (override through environment variables)
+AIRBNB_TILE_DEGREES = float(os.getenv("AIRBNB_TILE_DEGREES", 0.02))  # ~2 km of latitude
+AIRBNB_CACHE_TTL = int(os.getenv("AIRBNB_CACHE_TTL", 1800))
+AIRBNB_CACHE_MAX_TILES = int(os.getenv("AIRBNB_CACHE_MAX_TILES", 20000))
+AIRBNB_CACHE_MAX_LISTINGS = int(os.getenv("AIRBNB_CACHE_MAX_LISTINGS", 200000))
+# Queries covering more tiles than this skip the cache (e.g. a whole country)
+AIRBNB_CACHE_MAX_QUERY_TILES = int(os.getenv("AIRBNB_CACHE_MAX_QUERY_TILES", 2500))
+AIRBNB_INDEX_CELL_DEGREES = float(os.getenv("AIRBNB_INDEX_CELL_DEGREES", 0.005))
+# Most listings one search_all returns; a full answer is treated as truncated
+AIRBNB_RESULT_CAP = int(os.getenv("AIRBNB_RESULT_CAP", 280))
+# How many times a capped fetch is halved and searched again (0 keeps capped answers as they are)
+AIRBNB_SPLIT_DEPTH = int(os.getenv("AIRBNB_SPLIT_DEPTH", 1))
+AIRBNB_SPLIT_WORKERS = int(os.getenv("AIRBNB_SPLIT_WORKERS", 4))
+# Most listings one cached search returns, like a single search_all's cap
+AIRBNB_CACHE_MAX_RESULTS = int(os.getenv("AIRBNB_CACHE_MAX_RESULTS", 2 * AIRBNB_RESULT_CAP))
+
+
+def tile_of(lat, long, size=AIRBNB_TILE_DEGREES):
+    return math.floor(lat / size), math.floor(long / size)
+
+
+def tiles_for_bbox(ne_lat, ne_long, sw_lat, sw_long, size=AIRBNB_TILE_DEGREES):
+    """Every grid tile touched by a bounding box"""
+    south, west = tile_of(sw_lat, sw_long, size)
+    north, east = tile_of(ne_lat, ne_long, size)
+    return [(row, col) for row in range(south, north + 1) for col in range(west, east + 1)]
+
+
+def tile_bounds(tiles, size=AIRBNB_TILE_DEGREES):
+    """(ne_lat, ne_long, sw_lat, sw_long) of the rectangle covering the tiles"""
+    rows = [row for row, _ in tiles]
+    cols = [col for _, col in tiles]
+    return (max(rows) + 1) * size, (max(cols) + 1) * size, min(rows) * size, min(cols) * size
+
+
+class TileCache:
+    """
+    In-process LRU of search results per (tile, check_in, check_out, currency).
+
+    Each entry holds the ((fetch id, position), listing) pairs whose coordinates fall
+    in that tile, so the answer for any bounding box is the union of its
+    tiles. Bounded both by number of tiles and by total listings held.
+    """
+
+    def __init__(self, ttl, max_tiles, max_listings, on_evict=None):
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.max_tiles = max_tiles
+        self.max_listings = max_listings
+        self.entries = OrderedDict()
+        self.listing_count = 0
+        self.lock = threading.Lock()
+        self.stats = {"tile_hits": 0, "tile_misses": 0, "fetches": 0, "splits": 0, "bypassed": 0}
+
+    def get(self, key):
+        """Fresh ((fetch id, position), listing) pairs for a tile key, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            listings, stored_at = entry
+            if time.time() - stored_at >= self.ttl:
+                # Expired tiles are dropped (and unindexed) like evicted ones
+                del self.entries[key]
+                self.listing_count -= len(listings)
+                expired = listings
+            else:
+                self.entries.move_to_end(key)
+                return listings
+
+        if self.on_evict:
+            self.on_evict(key, expired)
+        return None
+
+    def is_fresh(self, key):
+        """Whether a tile is cached and within its TTL (doesn't touch the LRU order)"""
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and time.time() - entry[1] < self.ttl
+
+    def set(self, key, listings, stored_at):
+        with self.lock:
+            evicted = []
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.listing_count -= len(old[0])
+                # Listings the new answer dropped must leave the index too
+                evicted.append((key, old[0]))
+            self.entries[key] = (listings, stored_at)
+            self.listing_count += len(listings)
+            # Evict least recently used tiles until both limits hold
+            while len(self.entries) > 1 and (
+                len(self.entries) > self.max_tiles or self.listing_count > self.max_listings
+            ):
+                evicted_key, (evicted_listings, _) = self.entries.popitem(last=False)
+                self.listing_count -= len(evicted_listings)
+                evicted.append((evicted_key, evicted_listings))
+
+        if self.on_evict:
+            for evicted_key, evicted_listings in evicted:
+                self.on_evict(evicted_key, evicted_listings)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# One spatial index per (check_in, check_out, currency), holding the listings of its cached tiles
+_listing_indexes = {}
+_listing_indexes_lock = threading.Lock()
+
+
+def listing_index(check_in, check_out, currency, create=False):
+    """Spatial index over the cached listings of one search, or None if nothing is cached"""
+    with _listing_indexes_lock:
+        index = _listing_indexes.get((check_in, check_out, currency))
+        if index is None and create:
+            index = SpatialIndex(AIRBNB_INDEX_CELL_DEGREES)
+            _listing_indexes[(check_in, check_out, currency)] = index
+        return index
+
+
+def _unindex_tile(key, listings):
+    tile, check_in, check_out, currency = key
+    index = listing_index(check_in, check_out, currency)
+    if index is None:
+        return
+    for _, listing in listings:
+        # Only this tile's copy: a later fetch may have re-placed the room in another tile
+        index.remove(listing.room_id, listing)
+    if not len(index):
+        with _listing_indexes_lock:
+            _listing_indexes.pop((check_in, check_out, currency), None)
+
+
+airbnb_tile_cache = TileCache(
+    AIRBNB_CACHE_TTL, AIRBNB_CACHE_MAX_TILES, AIRBNB_CACHE_MAX_LISTINGS, on_evict=_unindex_tile
+)
+
+# Overlapping requests that miss the same tiles share one search_all call
+_search_singleflight = SingleFlight()
+
+# Orders fetches, so cached listings can be listed fetch by fetch
+_fetch_ids = itertools.count()
+
+# Runs the halves of a split fetch side by side
+_split_executor = ThreadPoolExecutor(max_workers=AIRBNB_SPLIT_WORKERS, thread_name_prefix="airbnb-split")
+
+
+def _in_bbox(listing, ne_lat, ne_long, sw_lat, sw_long):
+    return sw_lat <= listing.lat <= ne_lat and sw_long <= listing.long <= ne_long
+
+
+def _search_rectangle(rows, cols, check_in, check_out, zoom_value, currency, proxy_url):
+    """One search_all over a rectangle of tiles (rows and cols are ranges)"""
+    ne_lat, ne_long, sw_lat, sw_long = tile_bounds([(rows[0], cols[0]), (rows[-1], cols[-1])])
+    print(f"Airbnb tile cache: fetching {len(rows) * len(cols)} tiles as NE({ne_lat:.4f}, {ne_long:.4f}), SW({sw_lat:.4f}, {sw_long:.4f})")
+    airbnb_tile_cache.stats["fetches"] += 1
+    # Cached as compact records rather than the full nested dicts
+    return listing_records(providers.search_all(
+        check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url
+    ))
+
+
+def _halves(rows, cols):
+    """A rectangle of tiles cut in two along its longer side"""
+    if len(rows) >= len(cols):
+        return [(rows[:len(rows) // 2], cols), (rows[len(rows) // 2:], cols)]
+    return [(rows, cols[:len(cols) // 2]), (rows, cols[len(cols) // 2:])]
+
+
+def _store_rectangle(rows, cols, results, check_in, check_out, currency):
+    """Store one search_all answer as the contents of every tile in its rectangle"""
+    # Listings keep (fetch id, position in this answer): a union of tiles lists each
+    # fetch's listings in that fetch's relevance order, earlier fetches first
+    fetch_id = next(_fetch_ids)
+    by_tile = {(row, col): [] for row in rows for col in cols}
+    for position, listing in enumerate(results):
+        if listing.lat is None or listing.long is None:
+            continue
+        tile = tile_of(listing.lat, listing.long)
+        # Listings Airbnb returns from outside the rectangle aren't a complete answer for their tile
+        if tile in by_tile:
+            by_tile[tile].append(((fetch_id, position), listing))
+
+    now = time.time()
+    for tile, listings in by_tile.items():
+        airbnb_tile_cache.set((tile, check_in, check_out, currency), listings, now)
+        # Looked up after set: unindexing what set evicted can drop an emptied index
+        index = listing_index(check_in, check_out, currency, create=True)
+        for _, listing in listings:
+            index.insert(listing.room_id, listing.lat, listing.long, listing)
+    return by_tile
+
+
+def _fetch_rectangle(rows, cols, check_in, check_out, zoom_value, currency, proxy_url):
+    """
+    search_all over a rectangle of tiles (rows and cols are ranges); store every tile in it.
+
+    Airbnb stops at about AIRBNB_RESULT_CAP listings per search, so an answer
+    that reaches the cap is probably missing listings. Such a rectangle is
+    halved along its longer side and both halves searched in parallel, at
+    most AIRBNB_SPLIT_DEPTH times; past that the capped answer is kept.
+    """
+
+    def search(rectangle):
+        return _search_rectangle(*rectangle, check_in, check_out, zoom_value, currency, proxy_url)
+
+    by_tile = {}
+    level = [(rows, cols)]
+    answers = [search(level[0])]
+    for depth in range(AIRBNB_SPLIT_DEPTH + 1):
+        next_level = []
+        for (rows, cols), results in zip(level, answers):
+            capped = len(results) >= AIRBNB_RESULT_CAP
+            if capped and depth < AIRBNB_SPLIT_DEPTH and len(rows) * len(cols) > 1:
+                airbnb_tile_cache.stats["splits"] += 1
+                next_level.extend(_halves(rows, cols))
+                continue
+            if capped:
+                print(f"Airbnb tile cache: {len(rows) * len(cols)} tiles hit the result cap, they may be incomplete")
+            by_tile.update(_store_rectangle(rows, cols, results, check_in, check_out, currency))
+        if not next_level:
+            break
+        level = next_level
+        answers = list(_split_executor.map(search, level))
+    return by_tile
+
+
+def _fetch_tiles(tiles, check_in, check_out, zoom_value, currency, proxy_url):
+    """
+    Fetch the rectangle covering the tiles. It can cover more tiles than
+    were missing; all of them get refreshed.
+    """
+    rows = [row for row, _ in tiles]
+    cols = [col for _, col in tiles]
+    return _fetch_rectangle(
+        range(min(rows), max(rows) + 1),
+        range(min(cols), max(cols) + 1),
+        check_in, check_out, zoom_value, currency, proxy_url,
+    )
+
+
+def nearest_cached_listings(check_in, check_out, currency, lat, long, k, max_radius_km=None):
+    """
+    The k cached listings nearest a point, as (distance_km, listing) pairs.
+    Answered from memory only; empty when nothing nearby has been searched yet.
+    Listings of tiles past AIRBNB_CACHE_TTL are skipped even if not dropped yet.
+    """
+    index = listing_index(check_in, check_out, currency)
+    if index is None:
+        return []
+
+    def fresh(listing):
+        return airbnb_tile_cache.is_fresh((tile_of(listing.lat, listing.long), check_in, check_out, currency))
+
+    return index.nearest(lat, long, k, max_radius_km=max_radius_km, accept=fresh)
+
+
+def cached_search_all(check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url=""):
+    """
+    Drop-in for pyairbnb.search_all answered from the tile cache.
+    Returns ListingRecords instead of the raw dicts.
+
+    Only tiles that are missing or expired are fetched, with one search_all
+    over the rectangle that covers them (split up if the answer is capped).
+    The union of the tiles is filtered back down to the requested bounding
+    box. It isn't one relevance ranking: tiles from different fetches come
+    fetch by fetch, each in the order Airbnb returned it. At most
+    AIRBNB_CACHE_MAX_RESULTS listings come back, the best-placed of every fetch.
+    """
+    tiles = tiles_for_bbox(ne_lat, ne_long, sw_lat, sw_long)
+    if len(tiles) > AIRBNB_CACHE_MAX_QUERY_TILES:
+        airbnb_tile_cache.stats["bypassed"] += 1
+        return listing_records(providers.search_all(
+            check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url
+        ))
+
+    found = {tile: airbnb_tile_cache.get((tile, check_in, check_out, currency)) for tile in tiles}
+    missing = [tile for tile, listings in found.items() if listings is None]
+    airbnb_tile_cache.stats["tile_hits"] += len(tiles) - len(missing)
+    airbnb_tile_cache.stats["tile_misses"] += len(missing)
+    print(f"Airbnb tile cache: {len(tiles) - len(missing)} of {len(tiles)} tiles cached")
+
+    if missing:
+        fetch_key = (tile_bounds(missing), check_in, check_out, currency)
+        fetched = _search_singleflight.do(
+            fetch_key,
+            lambda: _fetch_tiles(missing, check_in, check_out, zoom_value, currency, proxy_url),
+        )
+        for tile in missing:
+            found[tile] = fetched.get(tile, [])
+
+    matches = [
+        entry
+        for tile in tiles
+        for entry in found[tile]
+        if _in_bbox(entry[1], ne_lat, ne_long, sw_lat, sw_long)
+    ]
+    if len(matches) > AIRBNB_CACHE_MAX_RESULTS:
+        # Trimmed rank by rank across fetches, so no fetch's area is dropped whole
+        matches = heapq.nsmallest(AIRBNB_CACHE_MAX_RESULTS, matches, key=lambda entry: entry[0][::-1])
+    # Fetch by fetch, each in Airbnb's order; rankings from different fetches aren't comparable
+    matches.sort(key=lambda entry: entry[0])
+    return [listing for _, listing in matches]
@@ -1,11 +1,25 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import pyairbnb
-import requests
+import providers
+from ranking import format_recommendation, iter_top_k, rank_top_k
+from review_analysis import analyze_reviews_batch
+from listing_table import ListingTable, parse_fields
+from pagination import CursorExpired, first_page, next_page, page_size_from
+from records import review_records
+from airbnb_cache import cached_search_all, nearest_cached_listings
+from streaming import stream_format, stream_response
+from browser_pool import BrowserPoolTimeout, get_browser_pool
+import json_provider
 
 
 app = Flask(__name__)
 CORS(app)
+json_provider.init_app(app)
+
+# Launch the scraping browsers now rather than on the first flight search
+# (replay answers scrapes from recordings and never needs them)
+if providers.TRAVEL_PROVIDER != "replay":
+    get_browser_pool().start()
 
 
 @app.route("/")
@@ -33,48 +47,41 @@ def search_airbnb():
     if not check_in or not check_out:
         return jsonify({"error": "Missing check-in or check-out dates"}), 400
 
+    bbox = (ne_lat, ne_long, sw_lat, sw_long)
+
+    # Optional projection (e.g. fields=id,price,rating,image_url) and pagination
+    cursor = request.args.get("cursor")
     try:
-        # Fetch Airbnb listings
-        search_results = pyairbnb.search_all(
-            check_in,
-            check_out,
-            ne_lat,
-            ne_long,
-            sw_lat,
-            sw_long,
-            zoom_value,
-            currency,
-            "",
+        fields = parse_fields(request.args.get("fields"))
+        page_size = request.args.get("page_size")
+        page_size = page_size_from(page_size) if page_size else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Later pages come from the result set the first page was cut from
+    if cursor:
+        try:
+            return jsonify(next_page(cursor, page_size, fields))
+        except CursorExpired as e:
+            return jsonify({"error": str(e)}), 410
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # Streamed mode: one NDJSON line / SSE event per listing as it's produced
+    fmt = stream_format(request)
+    if fmt:
+        return stream_response(
+            search_events(check_in, check_out, bbox, zoom_value, currency, category, fields), fmt
         )
 
-        listings_with_images = []
-        for listing in search_results:
-            # Check rating filter (>=4.3)
-            if float(listing.get("rating", {}).get("value", 0)) < 4.3:
-                continue  # Skip listings with low ratings
-
-            # Check category filter (if set)
-            if category and listing.get("category") != category:
-                continue  # Skip listings that don’t match the user’s category preference
-
-            # Extract image URLs
-            image_urls = [image["url"] for image in listing.get("images", [])]
+    try:
+        table, mask = filtered_search(check_in, check_out, bbox, zoom_value, currency, category)
 
-            # Extract price breakdown
-            price_details = listing.get("price", {}).get("total", {})
+        if page_size:
+            return jsonify(first_page(table, table.rows(mask), page_size, fields))
 
-            # Add listing with images & price breakdown to the result
-            listings_with_images.append(
-                {
-                    "id": listing.get("room_id"),
-                    "name": listing.get("name"),
-                    "url": f"https://www.airbnb.com/rooms/{listing.get('room_id')}",
-                    "rating": listing.get("rating", {}).get("value", None),
-                    "price": price_details.get("amount", None),
-                    "room_type": listing.get("category"),
-                    "image_urls": image_urls,
-                }
-            )
+        # Only the listings that pass are turned into response dicts (with images & price)
+        listings_with_images = table.project(mask, fields=fields)
 
         return jsonify(listings_with_images)
 
@@ -82,43 +89,94 @@ def search_airbnb():
         return jsonify({"error": str(e)}), 500
 
 
+def search_table(check_in, check_out, bbox, zoom_value, currency):
+    """ListingTable for a search (tiles already searched for these dates come from the cache)"""
+    ne_lat, ne_long, sw_lat, sw_long = bbox
+    search_results = cached_search_all(
+        check_in,
+        check_out,
+        ne_lat,
+        ne_long,
+        sw_lat,
+        sw_long,
+        zoom_value,
+        currency,
+        "",
+    )
+    return ListingTable(search_results)
+
+
+def filtered_search(check_in, check_out, bbox, zoom_value, currency, category):
+    """/search listings: rating (>=4.3) and category (if set) filters as vectorized masks"""
+    table = search_table(check_in, check_out, bbox, zoom_value, currency)
+    return table, table.rating_mask(4.3) & table.category_mask(category)
+
+
+def search_events(check_in, check_out, bbox, zoom_value, currency, category, fields=None):
+    """Streamed /search: "search" right away, then one "listing" per match, then "done" """
+    yield {"type": "search", "check_in": check_in, "check_out": check_out}
+    try:
+        table, mask = filtered_search(check_in, check_out, bbox, zoom_value, currency, category)
+        count = 0
+        for row in table.rows(mask):
+            yield dict(table.listing_info(row, fields), type="listing")
+            count += 1
+        yield {"type": "done", "count": count}
+    except Exception as e:
+        yield {"type": "error", "error": str(e)}
+
+
+@app.route("/nearby", methods=["GET"])
+def nearby_airbnb():
+    """
+    Cached listings nearest a point (e.g. an airport or city center).
+    Answered from listings earlier searches already fetched for these dates,
+    so it never calls Airbnb; run /search over the area first.
+    """
+    check_in = request.args.get("check_in", "2025-06-01")
+    check_out = request.args.get("check_out", "2025-06-04")
+    currency = request.args.get("currency", "USD")
+
+    try:
+        lat = float(request.args["lat"])
+        long = float(request.args["long"])
+        k = int(request.args.get("k", 10))
+        radius_km = request.args.get("radius_km")
+        radius_km = float(radius_km) if radius_km else None
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat and long are required; k and radius_km must be numbers"}), 400
+
+    nearby = nearest_cached_listings(
+        check_in, check_out, currency, lat, long, min(k, 500), max_radius_km=radius_km
+    )
+
+    table = ListingTable([listing for _, listing in nearby])
+    results = table.project(table.all())
+    for result, (distance, _) in zip(results, nearby):
+        result["distance_km"] = round(distance, 3)
+
+    return jsonify(results)
+
+
 # AI STUFF
 # Claude API Implementation
-import requests
 import json
-
-# Fixed Claude API implementation with accurate request format
-import os
-import requests
 import traceback
 from flask import jsonify
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
-# Get API key from environment variables
-CLAUDE_API_KEY = os.getenv("API_KEY")
-
-# Claude API configuration - Note the updated URL and headers
-CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
+# Shared Claude client: pooled connections, timeouts and retry/backoff
+from claude_client import CLAUDE_MODEL, ClaudeAPIError
+from providers import LLM_AVAILABLE, post_message
 
 
 def analyze_sentiment_with_claude(review_text):
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         print("API Key is missing. Please check your .env file.")
         return "NEUTRAL"
 
-    # Updated headers to match the correct format for Claude API
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # Corrected payload structure for Claude API
     payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 10,
         "messages": [
             {
@@ -131,20 +189,14 @@ def analyze_sentiment_with_claude(review_text):
 
     try:
         # Print request details for debugging
-        print(f"Sending request to Claude API with headers: {headers.keys()}")
         print(f"Payload: {payload}")
 
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=payload)
-
-        # Print response for debugging
-        print(f"Response status: {response.status_code}")
-        print(f"Response text: {response.text[:200]}")
-
-        if response.status_code != 200:
-            print(f"Error response: {response.text}")
+        try:
+            result = post_message(payload)
+        except ClaudeAPIError as e:
+            print(f"Error response: {str(e)}")
             return "NEUTRAL"
 
-        result = response.json()
         print(f"JSON response keys: {result.keys()}")
 
         # Extract the content from the response
@@ -168,20 +220,13 @@ def analyze_sentiment_with_claude(review_text):
 
 
 def extract_keywords_with_claude(review_text):
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         print("API Key is missing. Please check your .env file.")
         return []
 
-    # Updated headers for Claude API
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # Corrected payload for Claude API
     payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 100,
         "messages": [
             {
@@ -193,16 +238,12 @@ def extract_keywords_with_claude(review_text):
     }
 
     try:
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=payload)
-
-        if response.status_code != 200:
-            print(
-                f"Error in keyword extraction: {response.status_code} - {response.text}"
-            )
+        try:
+            result = post_message(payload)
+        except ClaudeAPIError as e:
+            print(f"Error in keyword extraction: {str(e)}")
             return []
 
-        result = response.json()
-
         # Extract content from response
         if "content" in result and len(result["content"]) > 0:
             keywords_text = result["content"][0].get("text", "").strip()
@@ -229,35 +270,35 @@ def get_reviews():
     proxy_url = request.args.get("proxy_url", "")
 
     try:
-        reviews_data = pyairbnb.get_reviews(room_url, proxy_url)
+        reviews_data = review_records(providers.get_reviews(room_url, proxy_url))
 
         # Limit to first 5 reviews to avoid overloading the API
         reviews_to_process = reviews_data[:5] if len(reviews_data) > 5 else reviews_data
 
-        results = []
-        for review in reviews_to_process:
-            comment = review.get("comments", "")
-            if comment:
-                # Add debugging
-                print(f"Processing review: {comment[:50]}...")
-
-                try:
-                    sentiment = analyze_sentiment_with_claude(comment)
-                    print(f"Sentiment result: {sentiment}")
-                except Exception as e:
-                    print(f"Sentiment analysis failed: {str(e)}")
-                    sentiment = "NEUTRAL"
+        reviews_with_comments = [
+            review for review in reviews_to_process if review.comments
+        ]
+        comments = [review.comments for review in reviews_with_comments]
+        print(f"Processing {len(comments)} reviews in one batch")
+
+        # One Claude call for all uncached reviews, per-review calls only as a fallback
+        analyses = analyze_reviews_batch(
+            comments,
+            analyze_sentiment_with_claude,
+            extract_keywords_with_claude,
+            review_ids=[review.id for review in reviews_with_comments],
+            ratings=[review.rating for review in reviews_with_comments],
+        )
 
-                try:
-                    keywords = extract_keywords_with_claude(comment)
-                    print(f"Keywords result: {keywords}")
-                except Exception as e:
-                    print(f"Keyword extraction failed: {str(e)}")
-                    keywords = []
-
-                results.append(
-                    {"comment": comment, "sentiment": sentiment, "keywords": keywords}
-                )
+        results = []
+        for comment, analysis in zip(comments, analyses):
+            results.append(
+                {
+                    "comment": comment,
+                    "sentiment": analysis["sentiment"],
+                    "keywords": analysis["keywords"],
+                }
+            )
 
         return jsonify(results)
 
@@ -291,171 +332,43 @@ def recommend_listings():
     sw_long = float(request.args.get("sw_long", -74.0005))
     zoom_value = int(request.args.get("zoom", 2))
 
-    try:
-        # Fetch Airbnb listings (reusing code from search_airbnb)
-        search_results = pyairbnb.search_all(
-            check_in,
-            check_out,
-            ne_lat,
-            ne_long,
-            sw_lat,
-            sw_long,
-            zoom_value,
-            currency,
-            "",
-        )
-
-        # Filter by price range first
-        filtered_listings = []
-        for listing in search_results:
-            # Extract price and convert to float
-            price = listing.get("price", {}).get("total", {}).get("amount", 0)
-            if price is None:
-                continue
-
-            price = float(price)
-
-            # Skip listings outside the price range
-            if price < min_price or price > max_price:
-                continue
-
-            # Basic listing info
-            listing_info = {
-                "id": listing.get("room_id"),
-                "name": listing.get("name"),
-                "url": f"https://www.airbnb.com/rooms/{listing.get('room_id')}",
-                "rating": listing.get("rating", {}).get("value", None),
-                "price": price,
-                "room_type": listing.get("category"),
-                "image_urls": [image["url"] for image in listing.get("images", [])],
-            }
-
-            filtered_listings.append(listing_info)
-
-        # List to store ranking results
-        ranked_listings = []
-
-        # Process up to 10 listings to avoid overloading
-        listings_to_process = (
-            filtered_listings[:10] if len(filtered_listings) > 10 else filtered_listings
-        )
-
-        # Score and rank each listing
-        for listing in listings_to_process:
-            try:
-                # Get reviews for this listing
-                room_url = f"https://www.airbnb.com/rooms/{listing['id']}"
-                reviews_data = pyairbnb.get_reviews(room_url, "")
-
-                # Process only first 3 reviews for efficiency
-                reviews_to_process = (
-                    reviews_data[:3] if len(reviews_data) > 3 else reviews_data
-                )
-
-                # Score this listing based on reviews
-                sentiment_score = 0
-                keyword_matches = 0
-                review_count = 0
-
-                for review in reviews_to_process:
-                    comment = review.get("comments", "")
-                    if not comment:
-                        continue
-
-                    review_count += 1
-
-                    # Analyze sentiment using Claude
-                    sentiment = analyze_sentiment_with_claude(comment)
-                    # Add to sentiment score
-                    if sentiment == "POSITIVE":
-                        sentiment_score += 1
-                    elif sentiment == "NEGATIVE":
-                        sentiment_score -= 1
-
-                    # Extract and match keywords using Claude
-                    keywords = extract_keywords_with_claude(comment)
-                    # Convert to lowercase for case-insensitive matching
-                    keywords_lower = [k.lower() for k in keywords]
-
-                    # Count matches with user keywords
-                    for user_keyword in user_keywords:
-                        for keyword in keywords_lower:
-                            if user_keyword in keyword or keyword in user_keyword:
-                                keyword_matches += 1
-                                break
-
-                # Calculate final score
-                # If no reviews, give a neutral base score
-                if review_count == 0:
-                    final_score = 0
-                else:
-                    # Normalize sentiment score to range of -1 to 1
-                    normalized_sentiment = sentiment_score / review_count
-
-                    # Give more weight to keyword matches (multiply by 2)
-                    final_score = (normalized_sentiment * 5) + (keyword_matches * 10)
-
-                # Add to ranked listings
-                ranked_listings.append(
-                    {
-                        "listing": listing,
-                        "score": final_score,
-                        "sentiment_score": sentiment_score,
-                        "keyword_matches": keyword_matches,
-                        "review_count": review_count,
-                    }
-                )
-
-            except Exception as e:
-                print(f"Error processing listing {listing['id']}: {str(e)}")
-                # Still add the listing but with a low score
-                ranked_listings.append(
-                    {
-                        "listing": listing,
-                        "score": -100,  # Give a very low score to listings with errors
-                        "error": str(e),
-                    }
-                )
+    bbox = (ne_lat, ne_long, sw_lat, sw_long)
+    user_preferences = {
+        "price_range": {"min": min_price, "max": max_price},
+        "keywords": user_keywords,
+    }
 
-        # Sort by score (highest first)
-        ranked_listings = sorted(
-            ranked_listings, key=lambda x: x["score"], reverse=True
+    # Streamed mode: each recommendation goes out as soon as its rank is final
+    fmt = stream_format(request)
+    if fmt:
+        return stream_response(
+            recommend_events(check_in, check_out, bbox, zoom_value, currency, user_preferences), fmt
         )
 
-        # Return top 3 listings with their scores
-        top_listings = (
-            ranked_listings[:3] if len(ranked_listings) >= 3 else ranked_listings
+    try:
+        # Fetch Airbnb listings (reusing code from search_airbnb)
+        table = search_table(check_in, check_out, bbox, zoom_value, currency)
+
+        # Filter by price range first (vectorized over the whole result set)
+        price_mask = table.price_mask(min_price, max_price)
+
+        # Cheap signals for every candidate, review analysis only for those that can still
+        # make the top 3 (at most DEEP_ANALYSIS_BUDGET of them)
+        top_listings, ranking_stats = rank_top_k(
+            table,
+            price_mask,
+            user_keywords,
+            analyze_sentiment_with_claude,
+            extract_keywords_with_claude,
+            min_price,
+            max_price,
         )
 
-        # Format the response
-        response = []
-        for item in top_listings:
-            listing_data = item["listing"]
-            response.append(
-                {
-                    "id": listing_data["id"],
-                    "name": listing_data["name"],
-                    "url": listing_data["url"],
-                    "price": listing_data["price"],
-                    "rating": listing_data["rating"],
-                    "image_urls": listing_data["image_urls"][
-                        :1
-                    ],  # Just the first image to keep response smaller
-                    "score": item["score"],
-                    "match_reasons": {
-                        "sentiment_score": item.get("sentiment_score", 0),
-                        "keyword_matches": item.get("keyword_matches", 0),
-                    },
-                }
-            )
-
         return jsonify(
             {
-                "results": response,
-                "user_preferences": {
-                    "price_range": {"min": min_price, "max": max_price},
-                    "keywords": user_keywords,
-                },
+                "results": [format_recommendation(item) for item in top_listings],
+                "user_preferences": user_preferences,
+                "ranking": ranking_stats,
             }
         )
 
@@ -464,7 +377,43 @@ def recommend_listings():
         return jsonify({"error": str(e)}), 500
 
 
-from travel import scrape_momondo
+def recommend_events(check_in, check_out, bbox, zoom_value, currency, user_preferences):
+    """
+    Streamed /recommend: "search" right away, "candidates" once the search is
+    in, one "recommendation" per top listing (in rank order) as soon as no
+    unscored listing could still outrank it, then "done" with the ranking stats.
+    """
+    min_price = user_preferences["price_range"]["min"]
+    max_price = user_preferences["price_range"]["max"]
+    yield {"type": "search", "check_in": check_in, "check_out": check_out}
+    try:
+        table = search_table(check_in, check_out, bbox, zoom_value, currency)
+        price_mask = table.price_mask(min_price, max_price)
+        yield {"type": "candidates", "count": int(price_mask.sum())}
+
+        rank = 0
+        for kind, payload in iter_top_k(
+            table,
+            price_mask,
+            user_preferences["keywords"],
+            analyze_sentiment_with_claude,
+            extract_keywords_with_claude,
+            min_price,
+            max_price,
+        ):
+            if kind == "final":
+                rank += 1
+                yield dict(format_recommendation(payload), type="recommendation", rank=rank)
+            else:
+                yield {"type": "done", "user_preferences": user_preferences, "ranking": payload}
+    except Exception as e:
+        print(f"Error in recommend_listings: {str(e)}")
+        yield {"type": "error", "error": str(e)}
+
+
+from providers import scrape_momondo, scrape_momondo_results
+from flight_jobs import JobQueueFull, flight_jobs
+from fare_matrix import build_cells, date_window, iter_fare_matrix
 
 
 @app.route("/api/search_flights", methods=["POST"])
@@ -483,11 +432,55 @@ def search_flights():
         children_ages = data.get("children_ages", [])
         infants_on_seat = int(data.get("infants_on_seat", 0))
         infants_on_lap = int(data.get("infants_on_lap", 0))
+        max_results = int(data.get("max_results", 0))
 
         # Validate required fields
         if not all([leaving_airport, destination_airport, departure_date, return_date]):
             return jsonify({"error": "Missing required fields"}), 400
 
+        # Async mode: hand the scrape to the job pool and return right away
+        if data.get("async"):
+            try:
+                job = flight_jobs.submit(
+                    {
+                        "leaving_airport": leaving_airport,
+                        "destination_airport": destination_airport,
+                        "departure_date": departure_date,
+                        "return_date": return_date,
+                        "num_adults": num_adults,
+                        "num_seniors": num_seniors,
+                        "num_students": num_students,
+                        "children_ages": children_ages,
+                        "infants_on_seat": infants_on_seat,
+                        "infants_on_lap": infants_on_lap,
+                        "max_results": max_results,
+                    }
+                )
+            except JobQueueFull as e:
+                return jsonify({"success": False, "error": str(e)}), 503
+            return jsonify(job), 202
+
+        # Multi-result mode: top N result cards from a single page load
+        if max_results > 0:
+            results = scrape_momondo_results(
+                leaving_airport=leaving_airport,
+                destination_airport=destination_airport,
+                departure_date=departure_date,
+                return_date=return_date,
+                num_adults=num_adults,
+                num_seniors=num_seniors,
+                num_students=num_students,
+                children_ages=children_ages,
+                infants_on_seat=infants_on_seat,
+                infants_on_lap=infants_on_lap,
+                max_results=max_results,
+            )
+
+            if results:
+                return jsonify({"success": True, "results": results})
+            else:
+                return jsonify({"success": False, "message": "No booking links found"}), 404
+
         # Call the scraper function
         result = scrape_momondo(
             leaving_airport=leaving_airport,
@@ -507,6 +500,10 @@ def search_flights():
         else:
             return jsonify({"success": False, "message": "No booking links found"}), 404
 
+    except BrowserPoolTimeout as e:
+        # Every browser busy: try again later, not "no booking links"
+        return jsonify({"success": False, "error": str(e)}), 503
+
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -520,16 +517,9 @@ def ai_flight_search():
     if not query:
         return jsonify({"error": "Missing query parameter"}), 400
 
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         return jsonify({"error": "Missing API key configuration"}), 500
 
-    # Set up Claude API request
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # System prompt to guide Claude's extraction
     system_prompt = """
     Extract flight search parameters from the user's natural language query.
@@ -565,7 +555,7 @@ def ai_flight_search():
 
     # Construct the prompt that will be sent to Claude
     claude_payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 500,
         "temperature": 0,
         "system": system_prompt,
@@ -579,18 +569,15 @@ def ai_flight_search():
 
     try:
         # Make request to Claude API
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=claude_payload)
-
-        if response.status_code != 200:
-            print(f"Claude API error: {response.text}")
+        try:
+            result = post_message(claude_payload)
+        except ClaudeAPIError as e:
+            print(f"Claude API error: {str(e)}")
             return (
-                jsonify({"error": f"AI processing error: {response.status_code}"}),
+                jsonify({"error": f"AI processing error: {e.status_code or 'no response'}"}),
                 500,
             )
 
-        # Parse Claude's response
-        result = response.json()
-
         if "content" not in result or len(result["content"]) == 0:
             return jsonify({"error": "Empty response from AI"}), 500
 
@@ -640,6 +627,17 @@ def ai_flight_search():
                 "destination_airport"
             ].upper()
 
+            # Async mode: hand the scrape to the job pool and return right away
+            if data.get("async"):
+                try:
+                    job = flight_jobs.submit(
+                        flight_params,
+                        extra={"extracted_params": flight_params},
+                    )
+                except JobQueueFull as e:
+                    return jsonify({"success": False, "error": str(e)}), 503
+                return jsonify(job), 202
+
             # Call the scraper function
             result = scrape_momondo(
                 leaving_airport=flight_params["leaving_airport"],
@@ -677,9 +675,70 @@ def ai_flight_search():
         except json.JSONDecodeError:
             return jsonify({"error": "Failed to parse AI response"}), 500
 
+    except BrowserPoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/flight_jobs/<job_id>", methods=["GET"])
+def get_flight_job(job_id):
+    job = flight_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+    return jsonify(flight_jobs.view(job))
+
+
+@app.route("/api/flight_jobs/<job_id>/stream", methods=["GET"])
+def stream_flight_job(job_id):
+    if flight_jobs.get(job_id) is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+    return Response(
+        flight_jobs.stream(job_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/fare_matrix", methods=["POST"])
+def fare_matrix():
+    """
+    Flexible-date search: scrapes every departure/return pair in the given
+    windows and streams one NDJSON line per cell as results come in.
+    """
+    data = request.json
+
+    try:
+        leaving_airport = data.get("leaving_airport")
+        destination_airport = data.get("destination_airport")
+        departure_window = data.get("departure_window")
+        return_window = data.get("return_window")
+
+        # Validate required fields
+        if not all([leaving_airport, destination_airport, departure_window, return_window]):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        flight_params = {
+            "leaving_airport": leaving_airport,
+            "destination_airport": destination_airport,
+            "num_adults": int(data.get("num_adults", 1)),
+            "num_seniors": int(data.get("num_seniors", 0)),
+            "num_students": int(data.get("num_students", 0)),
+            "children_ages": data.get("children_ages", []),
+            "infants_on_seat": int(data.get("infants_on_seat", 0)),
+            "infants_on_lap": int(data.get("infants_on_lap", 0)),
+        }
+
+        departure_dates = date_window(departure_window)
+        return_dates = date_window(return_window)
+        build_cells(departure_dates, return_dates)
+
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return stream_response(iter_fare_matrix(flight_params, departure_dates, return_dates), "ndjson")
+
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5001)
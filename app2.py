@@ -1,22 +1,29 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import pyairbnb
-import requests
+from ranking import format_recommendation, rank_top_k
+from listing_table import ListingTable
+from airbnb_cache import cached_search_all
+from streaming import stream_response
+from browser_pool import BROWSER_POOL_SIZE, BrowserPoolTimeout, get_browser_pool
+from review_fetcher import REVIEW_FETCH_WORKERS
+import json_provider
 import json
 import os
-from dotenv import load_dotenv
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Shared Claude client: pooled connections, timeouts and retry/backoff
+from claude_client import CLAUDE_MODEL, ClaudeAPIError
+from providers import LLM_AVAILABLE, TRAVEL_PROVIDER, post_message
 
 app = Flask(__name__)
 CORS(app)
+json_provider.init_app(app)
 
-# Load environment variables
-load_dotenv()
-
-# Get API key from environment variables
-CLAUDE_API_KEY = os.getenv("API_KEY")
-
-# Claude API configuration
-CLAUDE_API_URL = "https://api.anthropic.com/v1/messages"
+# Launch the scraping browsers now rather than on the first flight search
+# (replay answers scrapes from recordings and never needs them)
+if TRAVEL_PROVIDER != "replay":
+    get_browser_pool().start()
 
 # Airport to coordinate mapping (simplified for common destinations)
 # Format: [ne_lat, ne_long, sw_lat, sw_long, city_name]
@@ -38,22 +45,25 @@ AIRPORT_COORDINATES = {
 # Default coordinates (New York) if airport not found
 DEFAULT_COORDINATES = [40.7808, -73.9653, 40.7308, -74.0005, "New York"]
 
+# Per-leg timeouts for the integrated search, in seconds
+FLIGHT_LEG_TIMEOUT = float(os.getenv("FLIGHT_LEG_TIMEOUT", 120))
+ACCOMMODATION_LEG_TIMEOUT = float(os.getenv("ACCOMMODATION_LEG_TIMEOUT", 90))
+
+# Runs the flight and accommodation legs concurrently. Legs past these counts would only
+# queue on the browser pool or the review fetcher, so twice that leaves room for legs
+# that timed out and are still finishing in the background.
+TRAVEL_LEG_WORKERS = int(os.getenv("TRAVEL_LEG_WORKERS", 2 * (BROWSER_POOL_SIZE + REVIEW_FETCH_WORKERS)))
+leg_executor = ThreadPoolExecutor(max_workers=TRAVEL_LEG_WORKERS, thread_name_prefix="travel-leg")
+
 
 def analyze_sentiment_with_claude(review_text):
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         print("API Key is missing. Please check your .env file.")
         return "NEUTRAL"
 
-    # Updated headers to match the correct format for Claude API
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # Payload structure for Claude API
     payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 10,
         "messages": [
             {
@@ -65,14 +75,12 @@ def analyze_sentiment_with_claude(review_text):
     }
 
     try:
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=payload)
-
-        if response.status_code != 200:
-            print(f"Error response: {response.text}")
+        try:
+            result = post_message(payload)
+        except ClaudeAPIError as e:
+            print(f"Error response: {str(e)}")
             return "NEUTRAL"
 
-        result = response.json()
-
         # Extract the content from the response
         if "content" in result and len(result["content"]) > 0:
             sentiment = result["content"][0].get("text", "").strip().upper()
@@ -98,20 +106,13 @@ def extract_keywords_with_claude(review_text):
     Extract keywords from a review text using Claude API.
     Falls back to basic extraction if API fails.
     """
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         print("API Key is missing. Using fallback keyword extraction.")
         return fallback_keyword_extraction(review_text)
 
-    # Updated headers for Claude API
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # Payload for Claude API
     payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 100,
         "messages": [
             {
@@ -123,14 +124,12 @@ def extract_keywords_with_claude(review_text):
     }
 
     try:
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=payload)
-
-        if response.status_code != 200:
-            print(f"Error in keyword extraction: {response.status_code} - {response.text}")
+        try:
+            result = post_message(payload)
+        except ClaudeAPIError as e:
+            print(f"Error in keyword extraction: {str(e)}")
             return []
 
-        result = response.json()
-
         # Extract content from response
         if "content" in result and len(result["content"]) > 0:
             keywords_text = result["content"][0].get("text", "").strip()
@@ -173,7 +172,9 @@ def fallback_keyword_extraction(review_text):
     return found_keywords[:5]
 
 
-from travel import scrape_momondo
+from providers import scrape_momondo, scrape_momondo_results
+from flight_jobs import JobQueueFull, flight_jobs
+from fare_matrix import build_cells, date_window, iter_fare_matrix
 
 
 @app.route("/api/search_flights", methods=["POST"])
@@ -192,11 +193,55 @@ def search_flights():
         children_ages = data.get("children_ages", [])
         infants_on_seat = int(data.get("infants_on_seat", 0))
         infants_on_lap = int(data.get("infants_on_lap", 0))
+        max_results = int(data.get("max_results", 0))
 
         # Validate required fields
         if not all([leaving_airport, destination_airport, departure_date, return_date]):
             return jsonify({"error": "Missing required fields"}), 400
 
+        # Async mode: hand the scrape to the job pool and return right away
+        if data.get("async"):
+            try:
+                job = flight_jobs.submit(
+                    {
+                        "leaving_airport": leaving_airport,
+                        "destination_airport": destination_airport,
+                        "departure_date": departure_date,
+                        "return_date": return_date,
+                        "num_adults": num_adults,
+                        "num_seniors": num_seniors,
+                        "num_students": num_students,
+                        "children_ages": children_ages,
+                        "infants_on_seat": infants_on_seat,
+                        "infants_on_lap": infants_on_lap,
+                        "max_results": max_results,
+                    }
+                )
+            except JobQueueFull as e:
+                return jsonify({"success": False, "error": str(e)}), 503
+            return jsonify(job), 202
+
+        # Multi-result mode: top N result cards from a single page load
+        if max_results > 0:
+            results = scrape_momondo_results(
+                leaving_airport=leaving_airport,
+                destination_airport=destination_airport,
+                departure_date=departure_date,
+                return_date=return_date,
+                num_adults=num_adults,
+                num_seniors=num_seniors,
+                num_students=num_students,
+                children_ages=children_ages,
+                infants_on_seat=infants_on_seat,
+                infants_on_lap=infants_on_lap,
+                max_results=max_results,
+            )
+
+            if results:
+                return jsonify({"success": True, "results": results})
+            else:
+                return jsonify({"success": False, "message": "No booking links found"}), 404
+
         # Call the scraper function
         result = scrape_momondo(
             leaving_airport=leaving_airport,
@@ -216,6 +261,10 @@ def search_flights():
         else:
             return jsonify({"success": False, "message": "No booking links found"}), 404
 
+    except BrowserPoolTimeout as e:
+        # Every browser busy: try again later, not "no booking links"
+        return jsonify({"success": False, "error": str(e)}), 503
+
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -229,16 +278,9 @@ def ai_flight_search():
     if not query:
         return jsonify({"error": "Missing query parameter"}), 400
 
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         return jsonify({"error": "Missing API key configuration"}), 500
 
-    # Set up Claude API request
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # System prompt to guide Claude's extraction
     system_prompt = """
     Extract flight search parameters from the user's natural language query.
@@ -274,7 +316,7 @@ def ai_flight_search():
 
     # Construct the prompt that will be sent to Claude
     claude_payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 500,
         "temperature": 0,
         "system": system_prompt,
@@ -288,18 +330,15 @@ def ai_flight_search():
 
     try:
         # Make request to Claude API
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=claude_payload)
-
-        if response.status_code != 200:
-            print(f"Claude API error: {response.text}")
+        try:
+            result = post_message(claude_payload)
+        except ClaudeAPIError as e:
+            print(f"Claude API error: {str(e)}")
             return (
-                jsonify({"error": f"AI processing error: {response.status_code}"}),
+                jsonify({"error": f"AI processing error: {e.status_code or 'no response'}"}),
                 500,
             )
 
-        # Parse Claude's response
-        result = response.json()
-
         if "content" not in result or len(result["content"]) == 0:
             return jsonify({"error": "Empty response from AI"}), 500
 
@@ -349,6 +388,17 @@ def ai_flight_search():
                 "destination_airport"
             ].upper()
 
+            # Async mode: hand the scrape to the job pool and return right away
+            if data.get("async"):
+                try:
+                    job = flight_jobs.submit(
+                        flight_params,
+                        extra={"extracted_params": flight_params},
+                    )
+                except JobQueueFull as e:
+                    return jsonify({"success": False, "error": str(e)}), 503
+                return jsonify(job), 202
+
             # Call the scraper function
             result = scrape_momondo(
                 leaving_airport=flight_params["leaving_airport"],
@@ -386,10 +436,71 @@ def ai_flight_search():
         except json.JSONDecodeError:
             return jsonify({"error": "Failed to parse AI response"}), 500
 
+    except BrowserPoolTimeout as e:
+        return jsonify({"error": str(e)}), 503
+
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/flight_jobs/<job_id>", methods=["GET"])
+def get_flight_job(job_id):
+    job = flight_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+    return jsonify(flight_jobs.view(job))
+
+
+@app.route("/api/flight_jobs/<job_id>/stream", methods=["GET"])
+def stream_flight_job(job_id):
+    if flight_jobs.get(job_id) is None:
+        return jsonify({"error": "Unknown job ID"}), 404
+    return Response(
+        flight_jobs.stream(job_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/fare_matrix", methods=["POST"])
+def fare_matrix():
+    """
+    Flexible-date search: scrapes every departure/return pair in the given
+    windows and streams one NDJSON line per cell as results come in.
+    """
+    data = request.json
+
+    try:
+        leaving_airport = data.get("leaving_airport")
+        destination_airport = data.get("destination_airport")
+        departure_window = data.get("departure_window")
+        return_window = data.get("return_window")
+
+        # Validate required fields
+        if not all([leaving_airport, destination_airport, departure_window, return_window]):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        flight_params = {
+            "leaving_airport": leaving_airport,
+            "destination_airport": destination_airport,
+            "num_adults": int(data.get("num_adults", 1)),
+            "num_seniors": int(data.get("num_seniors", 0)),
+            "num_students": int(data.get("num_students", 0)),
+            "children_ages": data.get("children_ages", []),
+            "infants_on_seat": int(data.get("infants_on_seat", 0)),
+            "infants_on_lap": int(data.get("infants_on_lap", 0)),
+        }
+
+        departure_dates = date_window(departure_window)
+        return_dates = date_window(return_window)
+        build_cells(departure_dates, return_dates)
+
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return stream_response(iter_fare_matrix(flight_params, departure_dates, return_dates), "ndjson")
+
+
 @app.route("/api/integrated_travel_search", methods=["POST"])
 def integrated_travel_search():
     """
@@ -408,7 +519,7 @@ def integrated_travel_search():
     if not query:
         return jsonify({"error": "Missing query parameter"}), 400
 
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         return jsonify({"error": "Missing API key configuration"}), 500
 
     # 1. Extract flight search parameters using Claude
@@ -416,9 +527,80 @@ def integrated_travel_search():
     if "error" in flight_params:
         return jsonify(flight_params), 400
 
-    # 2. Find flight using Momondo
+    # 2. Get destination coordinates from airport code
+    destination_code = flight_params["destination_airport"]
+    
+    if destination_code in AIRPORT_COORDINATES:
+        ne_lat, ne_long, sw_lat, sw_long, destination_name = AIRPORT_COORDINATES[destination_code]
+    else:
+        ne_lat, ne_long, sw_lat, sw_long, destination_name = DEFAULT_COORDINATES
+        print(f"Warning: No coordinates found for airport {destination_code}, using default.")
+
+    # 3. Run the flight scrape and the Airbnb search side by side
+    started = time.monotonic()
+    flight_future = leg_executor.submit(search_flight_leg, flight_params)
+    accommodation_future = leg_executor.submit(
+        search_accommodation_leg,
+        flight_params,
+        (ne_lat, ne_long, sw_lat, sw_long),
+        min_price,
+        max_price,
+        keywords,
+    )
+
+    flight_result, flight_timed_out = wait_for_leg(flight_future, FLIGHT_LEG_TIMEOUT, started)
+    airbnb_results, accommodation_timed_out = wait_for_leg(
+        accommodation_future, ACCOMMODATION_LEG_TIMEOUT, started
+    )
+    if accommodation_timed_out:
+        airbnb_results = {
+            "error": "Accommodation search timed out",
+            "message": "Airbnb listings are still loading, please try again shortly",
+        }
+    print(f"Integrated search legs finished in {time.monotonic() - started:.2f}s")
+
+    # 4. Combine results and return (partial if a leg ran late)
+    return jsonify({
+        "flight": {
+            "success": flight_result is not None,
+            "booking_url": flight_result if flight_result else None,
+            "params": flight_params,
+            "timed_out": flight_timed_out,
+        },
+        "destination": {
+            "name": destination_name,
+            "airport_code": destination_code,
+            "coordinates": {
+                "ne_lat": ne_lat,
+                "ne_long": ne_long,
+                "sw_lat": sw_lat,
+                "sw_long": sw_long
+            }
+        },
+        "accommodations": airbnb_results,
+        "partial": flight_timed_out or accommodation_timed_out,
+    })
+
+
+def wait_for_leg(future, timeout, started):
+    """Wait for one leg of the integrated search; returns (result, timed_out)"""
+    remaining = max(0, timeout - (time.monotonic() - started))
     try:
-        flight_result = scrape_momondo(
+        return future.result(timeout=remaining), False
+    except FutureTimeoutError:
+        # A leg still queued never starts; one already running keeps going
+        # in the background and still fills the caches
+        if future.cancel():
+            print(f"Leg still queued after {timeout}s, cancelled it")
+        else:
+            print(f"Leg timed out after {timeout}s, returning partial results")
+        return None, True
+
+
+def search_flight_leg(flight_params):
+    """Flight leg of the integrated search"""
+    try:
+        return scrape_momondo(
             leaving_airport=flight_params["leaving_airport"],
             destination_airport=flight_params["destination_airport"],
             departure_date=flight_params["departure_date"],
@@ -432,18 +614,13 @@ def integrated_travel_search():
         )
     except Exception as e:
         print(f"Error scraping Momondo: {str(e)}")
-        flight_result = None
+        return None
+
+
+def search_accommodation_leg(flight_params, coordinates, min_price, max_price, keywords):
+    """Accommodation leg of the integrated search"""
+    ne_lat, ne_long, sw_lat, sw_long = coordinates
 
-    # 3. Get destination coordinates from airport code
-    destination_code = flight_params["destination_airport"]
-    
-    if destination_code in AIRPORT_COORDINATES:
-        ne_lat, ne_long, sw_lat, sw_long, destination_name = AIRPORT_COORDINATES[destination_code]
-    else:
-        ne_lat, ne_long, sw_lat, sw_long, destination_name = DEFAULT_COORDINATES
-        print(f"Warning: No coordinates found for airport {destination_code}, using default.")
-    
-    # 4. Search for Airbnb listings at the destination
     try:
         # Add a fallback mechanism in case the first search returns no results
         # First try with the exact coordinates from the airport mapping
@@ -462,7 +639,6 @@ def integrated_travel_search():
         
         # If no results found, try with a wider search area
         if not airbnb_results.get("results") and not airbnb_results.get("error"):
-            print("No results found. Attempting second Airbnb search with wider area...")
             # Calculate wider coordinates (approximately doubling the search area)
             center_lat = (ne_lat + sw_lat) / 2
             center_long = (ne_long + sw_long) / 2
@@ -473,7 +649,9 @@ def integrated_travel_search():
             wider_ne_long = center_long + long_radius
             wider_sw_lat = center_lat - lat_radius
             wider_sw_long = center_long - long_radius
-            
+
+            # Tiles already cached for these dates are reused; only the rest are fetched
+            print("No results found. Attempting second Airbnb search with wider area...")
             airbnb_results = search_and_rank_airbnbs(
                 check_in=flight_params["departure_date"],
                 check_out=flight_params["return_date"],
@@ -488,40 +666,15 @@ def integrated_travel_search():
     except Exception as e:
         print(f"Error searching Airbnb: {str(e)}")
         airbnb_results = {"error": str(e), "message": "Failed to search for Airbnb listings"}
-    
-    # 5. Combine results and return
-    return jsonify({
-        "flight": {
-            "success": flight_result is not None,
-            "booking_url": flight_result if flight_result else None,
-            "params": flight_params
-        },
-        "destination": {
-            "name": destination_name,
-            "airport_code": destination_code,
-            "coordinates": {
-                "ne_lat": ne_lat,
-                "ne_long": ne_long,
-                "sw_lat": sw_lat,
-                "sw_long": sw_long
-            }
-        },
-        "accommodations": airbnb_results
-    })
+
+    return airbnb_results
 
 
 def extract_flight_params(query):
     """Helper function to extract flight parameters from natural language query"""
-    if not CLAUDE_API_KEY:
+    if not LLM_AVAILABLE:
         return {"error": "Missing API key configuration"}
 
-    # Set up Claude API request
-    headers = {
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json",
-        "x-api-key": CLAUDE_API_KEY,
-    }
-
     # System prompt to guide Claude's extraction
     system_prompt = """
     Extract flight search parameters from the user's natural language query.
@@ -557,7 +710,7 @@ def extract_flight_params(query):
 
     # Construct the prompt that will be sent to Claude
     claude_payload = {
-        "model": "claude-3-7-sonnet-20250219",
+        "model": CLAUDE_MODEL,
         "max_tokens": 500,
         "temperature": 0,
         "system": system_prompt,
@@ -571,14 +724,11 @@ def extract_flight_params(query):
 
     try:
         # Make request to Claude API
-        response = requests.post(CLAUDE_API_URL, headers=headers, json=claude_payload)
-
-        if response.status_code != 200:
-            print(f"Claude API error: {response.text}")
-            return {"error": f"AI processing error: {response.status_code}"}
-
-        # Parse Claude's response
-        result = response.json()
+        try:
+            result = post_message(claude_payload)
+        except ClaudeAPIError as e:
+            print(f"Claude API error: {str(e)}")
+            return {"error": f"AI processing error: {e.status_code or 'no response'}"}
 
         if "content" not in result or len(result["content"]) == 0:
             return {"error": "Empty response from AI"}
@@ -645,8 +795,8 @@ def search_and_rank_airbnbs(check_in, check_out, ne_lat, ne_long, sw_lat, sw_lon
     print(f"Keywords: {user_keywords}")
         
     try:
-        # Fetch Airbnb listings
-        search_results = pyairbnb.search_all(
+        # Fetch Airbnb listings (tiles already searched for these dates come from the cache)
+        search_results = cached_search_all(
             check_in,
             check_out,
             ne_lat,
@@ -661,41 +811,16 @@ def search_and_rank_airbnbs(check_in, check_out, ne_lat, ne_long, sw_lat, sw_lon
         # Debug information
         print(f"Found {len(search_results)} Airbnb listings in the area")
 
-        # Filter by price range first
-        filtered_listings = []
-        for listing in search_results:
-            # Extract price and convert to float
-            price = listing.get("price", {}).get("total", {}).get("amount", 0)
-            if price is None:
-                continue
-
-            price = float(price)
-
-            # Skip listings outside the price range
-            if price < min_price or price > max_price:
-                continue
-
-            # Basic listing info
-            listing_info = {
-                "id": listing.get("room_id"),
-                "name": listing.get("name"),
-                "url": f"https://www.airbnb.com/rooms/{listing.get('room_id')}",
-                "rating": listing.get("rating", {}).get("value", None),
-                "price": price,
-                "room_type": listing.get("category"),
-                "image_urls": [image["url"] for image in listing.get("images", [])],
-            }
-
-            filtered_listings.append(listing_info)
-
-        # List to store ranking results
-        ranked_listings = []
+        # Filter by price range first (vectorized over the whole result set)
+        table = ListingTable(search_results)
+        price_mask = table.price_mask(min_price, max_price)
+        matching_count = int(price_mask.sum())
 
         # Debug information
-        print(f"After price filtering: {len(filtered_listings)} listings remain")
+        print(f"After price filtering: {matching_count} listings remain")
         
         # If no listings were found after filtering, return early with informative message
-        if len(filtered_listings) == 0:
+        if matching_count == 0:
             return {
                 "results": [],
                 "user_preferences": {
@@ -705,129 +830,26 @@ def search_and_rank_airbnbs(check_in, check_out, ne_lat, ne_long, sw_lat, sw_lon
                 "message": "No Airbnb listings found in this area matching your price range. Try expanding your search criteria."
             }
             
-        # Process up to 10 listings to avoid overloading
-        listings_to_process = (
-            filtered_listings[:10] if len(filtered_listings) > 10 else filtered_listings
+        # Cheap signals for every candidate, review analysis only for those that can still
+        # make the top 3 (at most DEEP_ANALYSIS_BUDGET of them)
+        top_listings, ranking_stats = rank_top_k(
+            table,
+            price_mask,
+            user_keywords,
+            analyze_sentiment_with_claude,
+            extract_keywords_with_claude,
+            min_price,
+            max_price,
+            penalize_fetch_errors=False,
         )
 
-        # Score and rank each listing
-        for listing in listings_to_process:
-            try:
-                # Get reviews for this listing
-                try:
-                    room_url = f"https://www.airbnb.com/rooms/{listing['id']}"
-                    reviews_data = pyairbnb.get_reviews(room_url, "")
-                    print(f"Successfully retrieved {len(reviews_data)} reviews for listing {listing['id']}")
-                except Exception as review_error:
-                    print(f"Error retrieving reviews for listing {listing['id']}: {str(review_error)}")
-                    reviews_data = []
-
-                # Process only first 3 reviews for efficiency
-                reviews_to_process = (
-                    reviews_data[:3] if len(reviews_data) > 3 else reviews_data
-                )
-
-                # Score this listing based on reviews
-                sentiment_score = 0
-                keyword_matches = 0
-                review_count = 0
-
-                for review in reviews_to_process:
-                    comment = review.get("comments", "")
-                    if not comment:
-                        continue
-
-                    review_count += 1
-
-                    # Analyze sentiment using Claude
-                    sentiment = analyze_sentiment_with_claude(comment)
-                    # Add to sentiment score
-                    if sentiment == "POSITIVE":
-                        sentiment_score += 1
-                    elif sentiment == "NEGATIVE":
-                        sentiment_score -= 1
-
-                    # Extract and match keywords using Claude
-                    keywords = extract_keywords_with_claude(comment)
-                    # Convert to lowercase for case-insensitive matching
-                    keywords_lower = [k.lower() for k in keywords]
-
-                    # Count matches with user keywords
-                    for user_keyword in user_keywords:
-                        for keyword in keywords_lower:
-                            if user_keyword in keyword or keyword in user_keyword:
-                                keyword_matches += 1
-                                break
-
-                # Calculate final score
-                # If no reviews, give a neutral base score
-                if review_count == 0:
-                    final_score = 0
-                else:
-                    # Normalize sentiment score to range of -1 to 1
-                    normalized_sentiment = sentiment_score / review_count
-
-                    # Give more weight to keyword matches (multiply by 2)
-                    final_score = (normalized_sentiment * 5) + (keyword_matches * 10)
-
-                # Add to ranked listings
-                ranked_listings.append(
-                    {
-                        "listing": listing,
-                        "score": final_score,
-                        "sentiment_score": sentiment_score,
-                        "keyword_matches": keyword_matches,
-                        "review_count": review_count,
-                    }
-                )
-
-            except Exception as e:
-                print(f"Error processing listing {listing['id']}: {str(e)}")
-                # Still add the listing but with a low score
-                ranked_listings.append(
-                    {
-                        "listing": listing,
-                        "score": -100,  # Give a very low score to listings with errors
-                        "error": str(e),
-                    }
-                )
-
-        # Sort by score (highest first)
-        ranked_listings = sorted(
-            ranked_listings, key=lambda x: x["score"], reverse=True
-        )
-
-        # Return top 3 listings with their scores
-        top_listings = (
-            ranked_listings[:3] if len(ranked_listings) >= 3 else ranked_listings
-        )
-
-        # Format the response
-        response = []
-        for item in top_listings:
-            listing_data = item["listing"]
-            response.append(
-                {
-                    "id": listing_data["id"],
-                    "name": listing_data["name"],
-                    "url": listing_data["url"],
-                    "price": listing_data["price"],
-                    "rating": listing_data["rating"],
-                    "image_urls": listing_data["image_urls"][:1],  # Just the first image
-                    "score": item["score"],
-                    "match_reasons": {
-                        "sentiment_score": item.get("sentiment_score", 0),
-                        "keyword_matches": item.get("keyword_matches", 0),
-                    },
-                }
-            )
-
         return {
-            "results": response,
+            "results": [format_recommendation(item) for item in top_listings],
             "user_preferences": {
                 "price_range": {"min": min_price, "max": max_price},
                 "keywords": user_keywords,
             },
+            "ranking": ranking_stats,
         }
 
     except Exception as e:
@@ -0,0 +1,112 @@
+"""
+Benchmark JSON serialization and response compression on /search-sized payloads.
+
+The payload is what /search returns for search_results.json (every listing
+projected with the default fields), repeated to get larger result sets.
+Serialization compares the stdlib json module, configured the way Flask's
+default provider is, against orjson; compression compares gzip levels and
+brotli (when installed). The last section goes through a Flask test client
+to time whole jsonify responses with each provider.
+
+Usage: python bench_json.py [search_results.json] [repeats]
+"""
+import json
+import sys
+import time
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from json_provider import OrjsonProvider, brotli, compress, orjson
+from listing_table import ListingTable
+from records import load_listings
+
+SIZES = (1, 10, 50)  # copies of the fixture listings per payload
+
+
+def best_of(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stdlib_dumps(payload):
+    # What DefaultJSONProvider.response does outside debug mode
+    return f"{json.dumps(payload, default=DefaultJSONProvider.default, ensure_ascii=True, sort_keys=True, separators=(',', ':'))}\n".encode()
+
+
+def orjson_dumps(payload):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE
+    return orjson.dumps(payload, default=DefaultJSONProvider.default, option=option)
+
+
+def serialization(payload, repeats):
+    print(f"  {'encoder':<10} {'time':>10} {'size':>10}")
+    body = stdlib_dumps(payload)
+    seconds = best_of(lambda: stdlib_dumps(payload), repeats)
+    print(f"  {'stdlib':<10} {seconds * 1000:>8.2f}ms {len(body):>10,}")
+    if orjson is not None:
+        fast_body = orjson_dumps(payload)
+        fast_seconds = best_of(lambda: orjson_dumps(payload), repeats)
+        assert json.loads(fast_body) == json.loads(body)
+        print(f"  {'orjson':<10} {fast_seconds * 1000:>8.2f}ms {len(fast_body):>10,}  ({seconds / fast_seconds:.1f}x)")
+    return body
+
+
+def compression(body, repeats):
+    print(f"  {'encoding':<10} {'time':>10} {'size':>10} {'ratio':>7}")
+    levels = [("gzip", level) for level in (1, 4, 6, 9)]
+    if brotli is not None:
+        levels += [("br", quality) for quality in (1, 5, 11)]
+    for encoding, level in levels:
+        compressed = compress(body, encoding, level)
+        seconds = best_of(lambda: compress(body, encoding, level), max(1, repeats // 2))
+        name = f"{encoding}-{level}"
+        print(f"  {name:<10} {seconds * 1000:>8.2f}ms {len(compressed):>10,} {len(body) / len(compressed):>6.1f}x")
+
+
+def flask_responses(payload, repeats):
+    """Whole jsonify round trips through the test client, compression included"""
+    providers = [("stdlib", DefaultJSONProvider)]
+    if orjson is not None:
+        providers.append(("orjson", OrjsonProvider))
+    print(f"  {'provider':<10} {'identity':>10} {'gzip-' + str(json_provider.GZIP_LEVEL):>10}")
+    for name, provider in providers:
+        app = Flask(__name__)
+        app.json = provider(app)
+        app.after_request(json_provider.compress_response)
+        app.add_url_rule("/search", "search", lambda: jsonify(payload))
+        client = app.test_client()
+        plain = best_of(lambda: client.get("/search"), repeats)
+        gzipped = best_of(lambda: client.get("/search", headers={"Accept-Encoding": "gzip"}), repeats)
+        print(f"  {name:<10} {plain * 1000:>8.2f}ms {gzipped * 1000:>8.2f}ms")
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "search_results.json"
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    table = ListingTable(load_listings(path))
+    listings = table.project(table.all())
+    print(f"{len(listings)} listings from {path}, best of {repeats} runs")
+    if orjson is None:
+        print("orjson isn't installed, only the stdlib encoder is measured")
+    if brotli is None:
+        print("brotli isn't installed, only gzip is measured")
+
+    for size in SIZES:
+        payload = listings * size
+        print(f"\n{len(payload)} listings")
+        body = serialization(payload, repeats)
+        compression(body, repeats)
+
+    print(f"\nFlask responses, {len(listings) * SIZES[1]} listings")
+    flask_responses(listings * SIZES[1], repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark the local review analyzer against the Claude path on reviews.json.
+
+Accuracy is measured against the reviewers' own star ratings
+(4-5 POSITIVE, 3 NEUTRAL, 1-2 NEGATIVE) and compared with the majority-class
+baseline (always answering the most common label). The local analyzer is run
+on the text alone, so reviews with no lexicon word come out UNKNOWN; coverage
+is the share it did answer. The Claude path only runs when API_KEY is set;
+pass --no-llm to skip it.
+
+Usage: python bench_review_analysis.py [reviews.json] [--no-llm]
+"""
+import json
+import sys
+import time
+
+import local_analyzer
+from collections import Counter
+
+from claude_client import CLAUDE_API_KEY
+from local_analyzer import UNKNOWN, rating_sentiment as rating_label
+from review_analysis import MAX_BATCH_SIZE, _request_batch
+
+
+def majority_baseline(labels):
+    label, count = Counter(labels).most_common(1)[0]
+    print(f"\nmajority baseline (always {label})")
+    print(f"  accuracy:   {count / len(labels):.3f}")
+    return count / len(labels)
+
+
+def report(name, predictions, labels, seconds, baseline):
+    correct = sum(1 for predicted, label in zip(predictions, labels) if predicted == label)
+    answered = [i for i, predicted in enumerate(predictions) if predicted != UNKNOWN]
+    answered_correct = sum(1 for i in answered if predictions[i] == labels[i])
+    accuracy = correct / len(labels)
+    print(f"\n{name}")
+    print(f"  time:       {seconds * 1000:.1f} ms ({len(labels) / seconds:,.0f} reviews/s)")
+    print(f"  accuracy:   {accuracy:.3f} ({'beats' if accuracy > baseline else 'does not beat'} the baseline)")
+    print(f"  coverage:   {len(answered)}/{len(labels)} answered, {answered_correct / max(1, len(answered)):.3f} accurate")
+    for label in ("POSITIVE", "NEUTRAL", "NEGATIVE"):
+        indices = [i for i, value in enumerate(labels) if value == label]
+        if indices:
+            hits = sum(1 for i in indices if predictions[i] == label)
+            print(f"  {label.lower():<9} recall {hits}/{len(indices)}")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    path = args[0] if args else "reviews.json"
+    with open(path) as f:
+        reviews = [review for review in json.load(f) if review.get("comments")]
+
+    comments = [review["comments"] for review in reviews]
+    labels = [rating_label(review.get("rating", 5)) for review in reviews]
+    print(f"{len(comments)} reviews from {path}")
+    baseline = majority_baseline(labels)
+
+    # Warm up once so numpy/regex setup isn't counted
+    local_analyzer.analyze_batch(comments[:10])
+    start = time.perf_counter()
+    local = local_analyzer.analyze_batch(comments)
+    local_seconds = time.perf_counter() - start
+    report("local_analyzer", [a["sentiment"] for a in local], labels, local_seconds, baseline)
+
+    if "--no-llm" in sys.argv or not CLAUDE_API_KEY:
+        print("\nSkipping the Claude path (no API key or --no-llm)")
+        return
+
+    start = time.perf_counter()
+    remote = []
+    for offset in range(0, len(comments), MAX_BATCH_SIZE):
+        remote.extend(_request_batch(comments[offset:offset + MAX_BATCH_SIZE]))
+    remote_seconds = time.perf_counter() - start
+    remote_sentiments = [a["sentiment"] if a else UNKNOWN for a in remote]
+    report("claude (batched)", remote_sentiments, labels, remote_seconds, baseline)
+
+    agreement = sum(1 for a, b in zip(local, remote_sentiments) if a["sentiment"] == b)
+    print(f"\nlocal/claude agreement: {agreement / len(comments):.3f}")
+    print(f"speedup: {remote_seconds / local_seconds:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
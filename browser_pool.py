@@ -0,0 +1,183 @@
+import atexit
+import os
+import queue
+import threading
+
+from playwright.sync_api import sync_playwright
+
+# Pool configuration (override through environment variables)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 2))
+BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", 50))
+# Longest wait for a free browser; the job itself is bounded by BROWSER_JOB_TIMEOUT
+BROWSER_CHECKOUT_TIMEOUT = float(os.getenv("BROWSER_CHECKOUT_TIMEOUT", 120))
+# 0 means no limit: scrapes already bound each step with their own timeouts
+BROWSER_JOB_TIMEOUT = float(os.getenv("BROWSER_JOB_TIMEOUT", 0))
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+
+class BrowserPoolTimeout(Exception):
+    pass
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    Owns one headless Chromium for its whole life.
+    Playwright's sync API is bound to the thread that started it, so every
+    job checked out from this browser runs on this thread.
+    """
+
+    def __init__(self, pool, index):
+        super().__init__(name=f"browser-pool-{index}", daemon=True)
+        self.pool = pool
+        self.playwright = None
+        self.browser = None
+        self.uses = 0
+
+    def launch(self):
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(headless=True)
+        self.uses = 0
+        print(f"[{self.name}] Launched Chromium")
+
+    def close_browser(self):
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception as e:
+                print(f"[{self.name}] Error closing browser: {e}")
+            self.browser = None
+
+    def healthy(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    def run(self):
+        # Launch up front so the first request doesn't pay for it (not counted as a use)
+        try:
+            self.launch()
+        except Exception as e:
+            print(f"[{self.name}] Error launching browser: {e}")
+
+        while True:
+            job = self.pool.jobs.get()
+            if job is None:
+                break
+
+            fn, context_options, done = job
+            with done["lock"]:
+                # The caller gave up waiting for a browser; nobody will read the result
+                if done["cancelled"]:
+                    continue
+                done["started"].set()
+            try:
+                # Health check before handing the browser out
+                if not self.healthy():
+                    self.close_browser()
+                    self.launch()
+
+                # Every job gets its own isolated context (cookies, storage, cache)
+                options = {
+                    "viewport": {"width": 1920, "height": 1080},
+                    "user_agent": USER_AGENT,
+                }
+                options.update(context_options or {})
+                context = self.browser.new_context(**options)
+                try:
+                    done["result"] = fn(context)
+                finally:
+                    context.close()
+            except Exception as e:
+                done["error"] = e
+            finally:
+                self.uses += 1
+                # Recycle the browser after N uses to keep memory in check
+                if self.uses >= self.pool.max_uses:
+                    print(f"[{self.name}] Recycling browser after {self.uses} uses")
+                    self.close_browser()
+                done["event"].set()
+
+        self.close_browser()
+        if self.playwright is not None:
+            self.playwright.stop()
+
+
+class BrowserPool:
+    """
+    Long-lived pool of pre-launched headless Chromium browsers.
+
+    Callers check a browser out with run(fn): fn receives a fresh browser
+    context, and the browser goes back to the pool as soon as fn returns.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES):
+        self.size = size
+        self.max_uses = max_uses
+        self.jobs = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            for index in range(self.size):
+                worker = _BrowserWorker(self, index)
+                worker.start()
+                self.workers.append(worker)
+            self.started = True
+
+    def run(self, fn, context_options=None, timeout=BROWSER_CHECKOUT_TIMEOUT, job_timeout=BROWSER_JOB_TIMEOUT):
+        """
+        Run fn(context) on a pooled browser and return its result.
+
+        timeout bounds the wait for a free browser; a job that doesn't get
+        one in time is cancelled and never runs. job_timeout (0 for none)
+        bounds fn itself once it has started.
+        """
+        self.start()
+        done = {
+            "event": threading.Event(),
+            "started": threading.Event(),
+            "lock": threading.Lock(),
+            "cancelled": False,
+        }
+        self.jobs.put((fn, context_options, done))
+
+        if not done["started"].wait(timeout):
+            with done["lock"]:
+                if not done["started"].is_set():
+                    done["cancelled"] = True
+            if done["cancelled"]:
+                raise BrowserPoolTimeout(f"No browser became free within {timeout}s")
+
+        if not done["event"].wait(job_timeout or None):
+            raise BrowserPoolTimeout(f"Browser job did not finish within {job_timeout}s")
+        if "error" in done:
+            raise done["error"]
+        return done.get("result")
+
+    def shutdown(self):
+        with self.lock:
+            for _ in self.workers:
+                self.jobs.put(None)
+            for worker in self.workers:
+                worker.join(timeout=10)
+            self.workers = []
+            self.started = False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Return the process-wide browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            # Make sure Chromium processes don't outlive the app
+            atexit.register(_pool.shutdown)
+        return _pool
@@ -0,0 +1,203 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """In-process LRU store of (value, stored_at) pairs."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        with self.lock:
+            self.entries[key] = (value, stored_at)
+            self.entries.move_to_end(key)
+            # Evict least recently used entries
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk LRU store backed by a single SQLite file.
+    Values must be JSON-serializable.
+
+    Several processes can share the file: the row count and eviction are
+    done in SQL inside each insert's write transaction. Reads don't write;
+    their access times are queued and saved every access_flush reads (or
+    with the next set).
+    """
+
+    def __init__(self, path, max_entries=10000, access_flush=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.access_flush = access_flush
+        self.accessed = {}  # key -> access time not saved yet
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+            )
+            self.conn.commit()
+
+    def _save_accessed(self):
+        # Caller holds the lock; runs in (or opens) the current write transaction
+        if self.accessed:
+            self.conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self.accessed.items()],
+            )
+            self.accessed.clear()
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.accessed[key] = time.time()
+            if len(self.accessed) >= self.access_flush:
+                self._save_accessed()
+                self.conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self.lock:
+            self.accessed.pop(key, None)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+            # Counted after the insert, inside its write transaction, so other
+            # processes sharing the file can't slip rows in between
+            self._save_accessed()
+            count = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_entries:
+                # Evict least recently used entries
+                self.conn.execute(
+                    """
+                    DELETE FROM cache WHERE key IN (
+                        SELECT key FROM cache ORDER BY accessed_at LIMIT ?
+                    )
+                    """,
+                    (count - self.max_entries,),
+                )
+            self.conn.commit()
+
+    def delete(self, key):
+        with self.lock:
+            self.accessed.pop(key, None)
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def make_cache_backend(kind="memory", path=None, max_entries=1000):
+    """Build a backend by name ("memory" or "sqlite")."""
+    if kind == "memory":
+        return MemoryBackend(max_entries=max_entries)
+    if kind == "sqlite":
+        return SQLiteBackend(path, max_entries=max_entries)
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+class TTLCache:
+    """
+    TTL cache over a pluggable backend with stale-while-revalidate.
+
+    Entries younger than ttl are served as-is. Entries younger than
+    ttl + stale_ttl are served immediately while a background thread
+    recomputes them. Anything older is recomputed inline.
+    """
+
+    def __init__(self, backend, ttl, stale_ttl=0, name="cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.name = name
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+
+    def get(self, key):
+        """Return a fresh value for key, or None."""
+        entry = self.backend.get(key)
+        if entry is None or time.time() - entry[1] >= self.ttl:
+            return None
+        return entry[0]
+
+    def set(self, key, value):
+        self.backend.set(key, value, time.time())
+
+    def get_or_compute(self, key, compute, cacheable=lambda value: value is not None):
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self.stats["hits"] += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self.stats["stale_hits"] += 1
+                self._revalidate(key, compute, cacheable)
+                return value
+
+        self.stats["misses"] += 1
+        value = compute()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def _revalidate(self, key, compute, cacheable):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                value = compute()
+                if cacheable(value):
+                    self.set(key, value)
+            except Exception as e:
+                print(f"Error refreshing {self.name} entry {key}: {str(e)}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"{self.name}-refresh", daemon=True).start()
@@ -0,0 +1,104 @@
+import os
+import random
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+# Load environment variables
+load_dotenv()
+
+# Get API key from environment variables
+CLAUDE_API_KEY = os.getenv("API_KEY")
+
+# Claude API configuration (the URL can point at a local stub server for testing)
+CLAUDE_API_URL = os.getenv("CLAUDE_API_URL", "https://api.anthropic.com/v1/messages")
+CLAUDE_API_VERSION = "2023-06-01"
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+
+CLAUDE_CONNECT_TIMEOUT = float(os.getenv("CLAUDE_CONNECT_TIMEOUT", 5))
+CLAUDE_READ_TIMEOUT = float(os.getenv("CLAUDE_READ_TIMEOUT", 60))
+CLAUDE_MAX_RETRIES = int(os.getenv("CLAUDE_MAX_RETRIES", 3))
+CLAUDE_BACKOFF_BASE = float(os.getenv("CLAUDE_BACKOFF_BASE", 0.5))
+CLAUDE_BACKOFF_MAX = float(os.getenv("CLAUDE_BACKOFF_MAX", 8))
+CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", 8))
+
+# Rate limited, overloaded, or a transient server error
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+
+# One keep-alive session for every Claude call in the process
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CLAUDE_MAX_CONCURRENCY)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+# Caps how many Claude requests are in flight at once
+_limiter = threading.BoundedSemaphore(CLAUDE_MAX_CONCURRENCY)
+
+
+class ClaudeAPIError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _backoff(attempt, retry_after=None):
+    """Jittered exponential backoff, honouring Retry-After when given"""
+    if retry_after:
+        try:
+            return min(float(retry_after), CLAUDE_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(CLAUDE_BACKOFF_MAX, CLAUDE_BACKOFF_BASE * 2 ** attempt))
+
+
+def post_message(payload):
+    """
+    Send a request to the messages API and return the parsed JSON.
+
+    Retries connection errors, timeouts, 429 and 5xx responses with
+    jittered exponential backoff. Raises ClaudeAPIError once retries
+    are used up or on any other non-200 status.
+    """
+    if not CLAUDE_API_KEY:
+        raise ClaudeAPIError("API Key is missing. Please check your .env file.")
+
+    headers = {
+        "anthropic-version": CLAUDE_API_VERSION,
+        "content-type": "application/json",
+        "x-api-key": CLAUDE_API_KEY,
+    }
+
+    for attempt in range(CLAUDE_MAX_RETRIES + 1):
+        last_attempt = attempt == CLAUDE_MAX_RETRIES
+        try:
+            with _limiter:
+                response = session.post(
+                    CLAUDE_API_URL,
+                    headers=headers,
+                    json=payload,
+                    timeout=(CLAUDE_CONNECT_TIMEOUT, CLAUDE_READ_TIMEOUT),
+                )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last_attempt:
+                raise ClaudeAPIError(f"Claude API request failed: {str(e)}")
+            delay = _backoff(attempt)
+            print(f"Claude API request failed ({str(e)}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        if response.status_code == 200:
+            return response.json()
+
+        if response.status_code in RETRY_STATUSES and not last_attempt:
+            delay = _backoff(attempt, response.headers.get("retry-after"))
+            print(f"Claude API returned {response.status_code}, retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        raise ClaudeAPIError(
+            f"Claude API error {response.status_code}: {response.text}",
+            status_code=response.status_code,
+        )
@@ -0,0 +1,105 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+
+from browser_pool import BROWSER_POOL_SIZE
+from providers import scrape_momondo_results
+
+# Matrix configuration (override through environment variables)
+FARE_MATRIX_WORKERS = int(os.getenv("FARE_MATRIX_WORKERS", BROWSER_POOL_SIZE))
+FARE_MATRIX_MAX_CELLS = int(os.getenv("FARE_MATRIX_MAX_CELLS", 60))
+
+# Shared across requests so all matrices together never exceed the bound
+_executor = ThreadPoolExecutor(max_workers=FARE_MATRIX_WORKERS, thread_name_prefix="fare-matrix")
+
+
+def date_window(window):
+    """Expand {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"} into a list of dates"""
+    start = window.get("start") if isinstance(window, dict) else None
+    end = (window.get("end") or start) if isinstance(window, dict) else None
+    if not isinstance(start, str) or not isinstance(end, str):
+        raise ValueError('Date windows must be objects like {"start": "YYYY-MM-DD", "end": "YYYY-MM-DD"}')
+    start = date.fromisoformat(start)
+    end = date.fromisoformat(end)
+    if end < start:
+        raise ValueError("Date window ends before it starts")
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def build_cells(departure_dates, return_dates):
+    """All (departure, return) pairs where the return is after the departure"""
+    cells = [(dep, ret) for dep in departure_dates for ret in return_dates if ret > dep]
+    if len(cells) > FARE_MATRIX_MAX_CELLS:
+        raise ValueError(f"Fare matrix has {len(cells)} cells, the limit is {FARE_MATRIX_MAX_CELLS}")
+    return cells
+
+
+def _scrape_cell(flight_params, departure_date, return_date):
+    results = scrape_momondo_results(
+        departure_date=departure_date,
+        return_date=return_date,
+        max_results=1,
+        **flight_params,
+    )
+    cell = {"departure_date": departure_date, "return_date": return_date}
+    if results:
+        best = results[0]
+        cell.update(
+            {
+                "success": True,
+                "price": best.get("price"),
+                "currency": best.get("currency"),
+                "carriers": best.get("carriers", []),
+                "booking_url": best.get("booking_url"),
+            }
+        )
+    else:
+        cell.update({"success": False, "message": "No booking links found"})
+    return cell
+
+
+def iter_fare_matrix(flight_params, departure_dates, return_dates):
+    """
+    Scrape every cell of the matrix on the bounded pool and yield each one
+    as soon as it finishes. Cells reuse the per-search flight cache, so
+    overlapping matrices don't scrape the same date pair twice.
+    Fares come in whatever currency Momondo shows; the cheapest cell is
+    picked among cells in the currency most of them were priced in.
+    """
+    cells = build_cells(departure_dates, return_dates)
+    yield {
+        "type": "matrix",
+        "departure_dates": departure_dates,
+        "return_dates": return_dates,
+        "cells": len(cells),
+    }
+
+    futures = {
+        _executor.submit(_scrape_cell, flight_params, dep, ret): (dep, ret) for dep, ret in cells
+    }
+    # Currency symbol -> (cells priced in it, cheapest of them)
+    by_currency = {}
+    try:
+        for future in as_completed(futures):
+            dep, ret = futures[future]
+            try:
+                cell = future.result()
+            except Exception as e:
+                print(f"Error scraping fare matrix cell {dep}/{ret}: {str(e)}")
+                cell = {"departure_date": dep, "return_date": ret, "success": False, "error": str(e)}
+
+            # Prices are only compared within one currency
+            if cell.get("price") is not None:
+                count, cheapest = by_currency.get(cell.get("currency"), (0, None))
+                if cheapest is None or cell["price"] < cheapest["price"]:
+                    cheapest = cell
+                by_currency[cell.get("currency")] = (count + 1, cheapest)
+            yield dict(cell, type="cell")
+    finally:
+        # Client went away: don't scrape cells nobody will read
+        for future in futures:
+            future.cancel()
+
+    cheapest = max(by_currency.values(), key=lambda entry: entry[0])[1] if by_currency else None
+    yield {"type": "done", "cheapest": cheapest}
+
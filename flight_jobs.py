@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from browser_pool import BROWSER_POOL_SIZE
+from providers import scrape_momondo, scrape_momondo_results
+from streaming import sse_event
+
+# Job configuration (override through environment variables)
+FLIGHT_JOB_WORKERS = int(os.getenv("FLIGHT_JOB_WORKERS", BROWSER_POOL_SIZE))
+FLIGHT_JOB_MAX_PENDING = int(os.getenv("FLIGHT_JOB_MAX_PENDING", 50))
+FLIGHT_JOB_TTL = int(os.getenv("FLIGHT_JOB_TTL", 600))
+SSE_HEARTBEAT_SECONDS = 15
+
+# Only these keys are passed through to the scraper
+SCRAPE_PARAMS = (
+    "leaving_airport",
+    "destination_airport",
+    "departure_date",
+    "return_date",
+    "num_adults",
+    "num_seniors",
+    "num_students",
+    "children_ages",
+    "infants_on_seat",
+    "infants_on_lap",
+    "max_results",
+)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class FlightJobManager:
+    """
+    Runs scrape_momondo calls on a bounded worker pool so Flask workers
+    can return a job ID immediately instead of blocking on the scrape.
+    """
+
+    def __init__(self, max_workers=FLIGHT_JOB_WORKERS, max_pending=FLIGHT_JOB_MAX_PENDING):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flight-job")
+        self.max_pending = max_pending
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, flight_params, extra=None):
+        """Queue a scrape and return the new job's public view."""
+        self._cleanup()
+        flight_params = {key: flight_params[key] for key in SCRAPE_PARAMS if key in flight_params}
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job["status"] in ("queued", "running"))
+            if pending >= self.max_pending:
+                raise JobQueueFull("Too many flight searches in progress, try again later")
+
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "status": "queued",
+                "params": flight_params,
+                "extra": extra or {},
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None,
+                "done": threading.Event(),
+            }
+            self.jobs[job_id] = job
+
+        self.executor.submit(self._run, job)
+        return self.view(job)
+
+    def _run(self, job):
+        job["status"] = "running"
+        try:
+            params = dict(job["params"])
+            max_results = params.pop("max_results", None)
+            if max_results:
+                results = scrape_momondo_results(**params, max_results=max_results)
+                job["result"] = {"success": bool(results), "results": results or []}
+            else:
+                booking_url = scrape_momondo(**params)
+                job["result"] = {"success": booking_url is not None, "booking_url": booking_url}
+            if not job["result"]["success"]:
+                job["result"]["message"] = "No booking links found"
+            job["status"] = "done"
+        except Exception as e:
+            print(f"Error in flight job {job['id']}: {str(e)}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            job["done"].set()
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def view(self, job):
+        """JSON-safe representation of a job."""
+        data = {
+            "job_id": job["id"],
+            "status": job["status"],
+            "poll_url": f"/api/flight_jobs/{job['id']}",
+            "stream_url": f"/api/flight_jobs/{job['id']}/stream",
+        }
+        if job["status"] == "done":
+            data.update(job["result"])
+        elif job["status"] == "failed":
+            data["success"] = False
+            data["error"] = job["error"]
+        data.update(job["extra"])
+        return data
+
+    def stream(self, job_id):
+        """Yield server-sent events for a job until it finishes."""
+        job = self.get(job_id)
+        if job is None:
+            yield sse_event("error", {"error": "Unknown job ID"})
+            return
+
+        yield sse_event("status", self.view(job))
+        while not job["done"].wait(SSE_HEARTBEAT_SECONDS):
+            # Comment line keeps proxies from closing an idle connection
+            yield ": heartbeat\n\n"
+        yield sse_event("result", self.view(job))
+
+    def _cleanup(self):
+        cutoff = time.time() - FLIGHT_JOB_TTL
+        with self.lock:
+            expired = [
+                job_id
+                for job_id, job in self.jobs.items()
+                if job["finished_at"] is not None and job["finished_at"] < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+
+flight_jobs = FlightJobManager()
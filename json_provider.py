@@ -0,0 +1,133 @@
+import gzip
+import json
+import os
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+# Optional speedups: orjson for serialization, brotli for compression.
+# Without them we fall back to the stdlib json module and gzip.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# JSON configuration (override through environment variables)
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson").lower()  # "orjson" or "stdlib"
+
+# Response compression configuration
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))  # smaller bodies go out as they are
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 4))  # most of level 9's ratio at half the cost
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+
+COMPRESSIBLE_MIMETYPES = {"application/json", "text/html", "text/plain", "text/css", "application/javascript"}
+
+
+def use_orjson():
+    return orjson is not None and JSON_PROVIDER == "orjson"
+
+
+def dumps(obj):
+    """Compact JSON string, through orjson when it's available"""
+    if use_orjson():
+        return orjson.dumps(obj, default=DefaultJSONProvider.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=DefaultJSONProvider.default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Output matches DefaultJSONProvider (sorted keys, compact unless the app
+    is in debug mode); types orjson can't serialize go through Flask's own
+    default() so dates, Decimals and the like still work.
+    """
+
+    # orjson always writes UTF-8 rather than \u escapes
+    ensure_ascii = False
+
+    def _option(self, sort_keys=None, indent=None):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        option = self._option(kwargs.get("sort_keys"), kwargs.get("indent"))
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._option(indent=pretty) | orjson.OPT_APPEND_NEWLINE
+        # Straight to bytes, no str round trip
+        body = orjson.dumps(obj, default=self.default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def accepted_encoding(accept_encodings):
+    """Best encoding we can produce for an Accept-Encoding header: "br", "gzip" or None"""
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = None
+    best_quality = 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        # Equal quality keeps the earlier (smaller) encoding
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level=None):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def compress_response(response):
+    """after_request hook: compress buffered text responses the client accepts compressed"""
+    if (
+        response.direct_passthrough
+        or response.is_streamed  # NDJSON/SSE streams go out event by event
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = accepted_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app):
+    """Use orjson for the app's JSON (when installed) and compress its responses"""
+    if use_orjson():
+        app.json = OrjsonProvider(app)
+    if RESPONSE_COMPRESSION:
+        app.after_request(compress_response)
+    print(
+        f"JSON: {'orjson' if use_orjson() else 'stdlib'}, compression: "
+        f"{('br, gzip' if brotli is not None else 'gzip') if RESPONSE_COMPRESSION else 'off'}"
+    )
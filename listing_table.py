@@ -0,0 +1,133 @@
+import math
+
+import numpy as np
+
+from records import listing_records
+
+
+def _column(values):
+    """float64 array with None (missing) as NaN"""
+    return np.array([math.nan if value is None else value for value in values], dtype=np.float64)
+
+
+# Response fields and how to build each one from a ListingRecord
+LISTING_FIELDS = {
+    "id": lambda listing: listing.room_id,
+    "name": lambda listing: listing.name,
+    "url": lambda listing: f"https://www.airbnb.com/rooms/{listing.room_id}",
+    "rating": lambda listing: listing.rating,
+    "price": lambda listing: listing.price,
+    "room_type": lambda listing: listing.category,
+    "image_urls": lambda listing: list(listing.image_urls),
+    # Just the first image, for clients that only render a thumbnail
+    "image_url": lambda listing: listing.image_urls[0] if listing.image_urls else None,
+}
+
+# What a listing looks like when no projection is asked for
+DEFAULT_FIELDS = ("id", "name", "url", "rating", "price", "room_type", "image_urls")
+
+
+def parse_fields(value):
+    """
+    Field list from a comma-separated fields= parameter (None when empty).
+    Raises ValueError naming any unknown field.
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(field.strip() for field in value.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in LISTING_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(LISTING_FIELDS)}"
+        )
+    return fields or None
+
+
+class ListingTable:
+    """
+    Columnar view of a pyairbnb.search_all result set.
+
+    The numeric fields of the listing records are copied once into NumPy
+    arrays (missing values become NaN), so filters are vectorized masks
+    instead of per-listing attribute lookups. Rows are only turned back
+    into response dicts for the listings that survive the filters.
+    """
+
+    def __init__(self, listings):
+        # search_all dicts are converted to ListingRecords; records are used as-is
+        self.listings = listing_records(listings)
+        count = len(self.listings)
+
+        self.price = _column(listing.price for listing in self.listings)
+        self.rating = _column(listing.rating for listing in self.listings)
+        self.review_count = _column(listing.review_count for listing in self.listings)
+        self.lat = _column(listing.lat for listing in self.listings)
+        self.long = _column(listing.long for listing in self.listings)
+
+        # Category strings -> small integer codes
+        self.categories = []
+        category_codes = {}
+        codes = np.empty(count, dtype=np.int32)
+        for row, listing in enumerate(self.listings):
+            category = listing.category
+            if category not in category_codes:
+                category_codes[category] = len(self.categories)
+                self.categories.append(category)
+            codes[row] = category_codes[category]
+        self.category_code = codes
+        self._category_codes = category_codes
+
+    def __len__(self):
+        return len(self.listings)
+
+    def all(self):
+        return np.ones(len(self.listings), dtype=bool)
+
+    # Filters: each returns a boolean mask; combine them with &
+
+    def rating_mask(self, min_rating):
+        return self.rating >= min_rating
+
+    def price_mask(self, min_price=None, max_price=None):
+        mask = ~np.isnan(self.price)
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        return mask
+
+    def category_mask(self, category):
+        """Listings in the category; no category (None or "") matches everything"""
+        if not category:
+            return self.all()
+        code = self._category_codes.get(category)
+        if code is None:
+            return np.zeros(len(self.listings), dtype=bool)
+        return self.category_code == code
+
+    def bbox_mask(self, ne_lat, ne_long, sw_lat, sw_long):
+        return (
+            (self.lat >= sw_lat)
+            & (self.lat <= ne_lat)
+            & (self.long >= sw_long)
+            & (self.long <= ne_long)
+        )
+
+    def rows(self, mask):
+        """Row numbers selected by a mask, in search-result order"""
+        return np.flatnonzero(mask)
+
+    def listing_info(self, row, fields=None):
+        """
+        Response dict for one row (the shape /search and /recommend return),
+        or only the given fields; unrequested fields are never built.
+        """
+        listing = self.listings[row]
+        return {field: LISTING_FIELDS[field](listing) for field in fields or DEFAULT_FIELDS}
+
+    def project(self, mask, limit=None, fields=None):
+        """Response dicts for the rows selected by a mask (the first limit rows, if given)"""
+        rows = self.rows(mask)
+        if limit is not None:
+            rows = rows[:limit]
+        return [self.listing_info(row, fields) for row in rows]
@@ -0,0 +1,187 @@
+import re
+
+import numpy as np
+
+# Word -> sentiment weight. Covers the languages that show up most in our
+# review captures (English, French, Spanish, German, Italian, Dutch, Polish).
+SENTIMENT_LEXICON = {
+    # Positive
+    "good": 1, "great": 2, "amazing": 3, "awesome": 3, "excellent": 3, "fantastic": 3,
+    "wonderful": 3, "beautiful": 2, "lovely": 2, "nice": 1, "perfect": 3, "stunning": 3,
+    "incredible": 3, "spectacular": 3, "gorgeous": 3, "charming": 2, "cozy": 2, "cosy": 2,
+    "comfortable": 2, "clean": 1, "spotless": 2, "quiet": 1, "peaceful": 2, "relaxing": 2,
+    "friendly": 2, "helpful": 2, "welcoming": 2, "kind": 1, "recommend": 2, "recommended": 2,
+    "enjoyed": 2, "love": 2, "loved": 2, "best": 2, "convenient": 1, "spacious": 1,
+    "thank": 1, "thanks": 1, "happy": 2, "pleasant": 2, "magical": 3, "superb": 3,
+    "super": 2, "unforgettable": 3, "exceptional": 3, "gem": 2, "paradise": 3,
+    "magnifique": 3, "superbe": 3, "parfait": 3, "merci": 1, "agréable": 2,
+    "accueillant": 2, "chaleureux": 2, "incroyable": 3, "génial": 3, "recommande": 2,
+    "propre": 1, "calme": 1, "bien": 1, "magique": 3, "beau": 2, "belle": 2, "bel": 1,
+    "increíble": 3, "increibles": 3, "increíbles": 3, "maravilloso": 3, "precioso": 3,
+    "bonito": 2, "genial": 3, "perfecto": 3, "excelente": 3, "recomendable": 2,
+    "gracias": 1, "tranquilidad": 1, "bueno": 1, "buena": 1, "buen": 1, "encantador": 2,
+    "limpio": 1, "tranquilo": 1, "hermoso": 3, "hermosa": 3, "espectacular": 3, "recomiendo": 2,
+    "schön": 2, "schöne": 2, "schöner": 2, "toll": 2, "wunderbar": 3,
+    "wunderschön": 3, "fantastisch": 3, "empfehlen": 2, "sauber": 1, "freundlich": 2,
+    "perfekt": 3, "herzlich": 2, "gemütlich": 2,
+    "bellissima": 3, "bellissimo": 3, "meraviglioso": 3, "stupendo": 3, "gentile": 2,
+    "consiglio": 2, "pulito": 1, "ottimo": 3, "bello": 2, "bella": 2,
+    "prachtig": 3, "mooi": 2, "aanrader": 2, "fijn": 1,
+    "polecam": 2, "piękne": 2, "piękny": 2, "świetne": 2, "wspaniałe": 3,
+    # Negative
+    "bad": -2, "terrible": -3, "awful": -3, "horrible": -3, "dirty": -2, "noisy": -2,
+    "loud": -1, "uncomfortable": -2, "disappointing": -2, "disappointed": -2, "rude": -3,
+    "smelly": -2, "cold": -1, "broken": -2, "poor": -2, "worst": -3, "unfortunately": -1,
+    "problem": -1, "problems": -1, "issue": -1, "issues": -1, "cramped": -1, "tiny": -1,
+    "expensive": -1, "overpriced": -2, "mold": -2, "bugs": -2, "cockroaches": -3,
+    "bruyant": -2, "décevant": -2, "déçu": -2, "dommage": -1, "malheureusement": -1,
+    "sucio": -2, "ruidoso": -2, "desafortunadamente": -1,
+    "schmutzig": -2, "laut": -1, "leider": -1, "enttäuscht": -2,
+    "sporco": -2, "rumoroso": -2, "purtroppo": -1,
+}
+
+# Words that flip the sentiment of the next few words
+NEGATORS = {"not", "no", "never", "nothing", "hardly", "isn't", "wasn't", "don't", "didn't",
+            "ne", "pas", "jamais", "nicht", "kein", "keine", "nunca", "non", "nie", "niet"}
+NEGATION_WINDOW = 3
+
+# Aspect keywords we tag reviews with (same set as the app's fallback extraction)
+ASPECT_KEYWORDS = [
+    "clean", "spacious", "comfortable", "quiet", "view", "location",
+    "convenient", "modern", "cozy", "pool", "beach", "kitchen",
+    "bathroom", "bedroom", "host", "communication", "check-in",
+    "parking", "wifi", "amenities", "restaurants", "transportation",
+    "downtown", "private", "safe", "value", "price", "luxury",
+]
+
+# Scores at or beyond these are called POSITIVE / NEGATIVE
+POSITIVE_THRESHOLD = 1
+NEGATIVE_THRESHOLD = -1
+
+# Sentiment for a review with no lexicon word in it (and no rating to go on).
+# Not NEUTRAL: most of these are simply in a language the lexicon doesn't cover.
+UNKNOWN = "UNKNOWN"
+
+MAX_KEYWORDS = 5
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_TOKEN_RE = re.compile(r"[^\W\d_]+(?:[-'’][^\W\d_]+)*")
+
+# Vocabulary: every lexicon word, negator and aspect keyword gets an ID
+_vocab = {}
+for _word in list(SENTIMENT_LEXICON) + sorted(NEGATORS) + ASPECT_KEYWORDS:
+    _vocab.setdefault(_word, len(_vocab))
+_UNKNOWN = len(_vocab)
+
+_weights = np.zeros(_UNKNOWN + 1, dtype=np.float32)
+_is_negator = np.zeros(_UNKNOWN + 1, dtype=bool)
+_aspect_index = np.full(_UNKNOWN + 1, -1, dtype=np.int32)
+for _word, _weight in SENTIMENT_LEXICON.items():
+    _weights[_vocab[_word]] = _weight
+for _word in NEGATORS:
+    _is_negator[_vocab[_word]] = True
+for _index, _word in enumerate(ASPECT_KEYWORDS):
+    _aspect_index[_vocab[_word]] = _index
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(_TAG_RE.sub(" ", text).lower().replace("’", "'"))
+
+
+def _encode(comments):
+    """Flatten a batch into parallel (token id, document index) arrays"""
+    ids = []
+    docs = []
+    for doc, comment in enumerate(comments):
+        tokens = tokenize(comment)
+        ids.extend(_vocab.get(token, _UNKNOWN) for token in tokens)
+        docs.extend([doc] * len(tokens))
+    return np.asarray(ids, dtype=np.int32), np.asarray(docs, dtype=np.int32)
+
+
+def _sentiment_from_encoded(ids, docs, count):
+    if len(ids) == 0:
+        return np.zeros(count, dtype=np.float32)
+
+    weights = _weights[ids]
+
+    # Position of the most recent negator at or before each token
+    positions = np.arange(len(ids))
+    last_negator = np.maximum.accumulate(np.where(_is_negator[ids], positions, -1))
+    negator_doc = docs[np.maximum(last_negator, 0)]
+    negated = (
+        (last_negator >= 0)
+        & (positions > last_negator)
+        & (positions - last_negator <= NEGATION_WINDOW)
+        & (negator_doc == docs)
+    )
+    weights = np.where(negated, -weights, weights)
+
+    return np.bincount(docs, weights=weights, minlength=count).astype(np.float32)
+
+
+def _aspects_from_encoded(ids, docs, count):
+    matrix = np.zeros((count, len(ASPECT_KEYWORDS)), dtype=bool)
+    if len(ids) == 0:
+        return matrix
+    aspects = _aspect_index[ids]
+    hits = aspects >= 0
+    matrix[docs[hits], aspects[hits]] = True
+    return matrix
+
+
+def _lexicon_hits(ids, docs, count):
+    """Number of lexicon words per comment"""
+    if len(ids) == 0:
+        return np.zeros(count, dtype=np.int64)
+    return np.bincount(docs, weights=_weights[ids] != 0, minlength=count).astype(np.int64)
+
+
+def rating_sentiment(rating):
+    """Sentiment implied by a 1-5 star rating"""
+    if rating >= 4:
+        return "POSITIVE"
+    if rating <= 2:
+        return "NEGATIVE"
+    return "NEUTRAL"
+
+
+def sentiment_scores(comments):
+    """Lexicon sentiment score per comment, computed for the whole batch at once"""
+    ids, docs = _encode(comments)
+    return _sentiment_from_encoded(ids, docs, len(comments))
+
+
+def aspect_matrix(comments):
+    """Boolean (comments x ASPECT_KEYWORDS) matrix of keyword mentions"""
+    ids, docs = _encode(comments)
+    return _aspects_from_encoded(ids, docs, len(comments))
+
+
+def analyze_batch(comments, ratings=None):
+    """
+    Sentiment and aspect keywords for a batch of reviews, on the CPU.
+    Returns one {"sentiment", "keywords"} dict per comment, like the LLM path.
+
+    A comment with no lexicon word in it gets the sentiment of its star
+    rating when ratings are given, else UNKNOWN.
+    """
+    ids, docs = _encode(comments)
+    scores = _sentiment_from_encoded(ids, docs, len(comments))
+    hits = _lexicon_hits(ids, docs, len(comments))
+    matrix = _aspects_from_encoded(ids, docs, len(comments))
+    ratings = ratings or [None] * len(comments)
+
+    analyses = []
+    for score, hit_count, rating, row in zip(scores, hits, ratings, matrix):
+        if not hit_count:
+            sentiment = rating_sentiment(rating) if isinstance(rating, (int, float)) else UNKNOWN
+        elif score >= POSITIVE_THRESHOLD:
+            sentiment = "POSITIVE"
+        elif score <= NEGATIVE_THRESHOLD:
+            sentiment = "NEGATIVE"
+        else:
+            sentiment = "NEUTRAL"
+        keywords = [ASPECT_KEYWORDS[index] for index in np.flatnonzero(row)[:MAX_KEYWORDS]]
+        analyses.append({"sentiment": sentiment, "keywords": keywords})
+    return analyses
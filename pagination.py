@@ -0,0 +1,85 @@
+import base64
+import json
+import os
+import uuid
+
+from cache import MemoryBackend, TTLCache
+from listing_table import LISTING_FIELDS
+
+# Cursor pagination configuration (override through environment variables)
+SEARCH_PAGE_TTL = int(os.getenv("SEARCH_PAGE_TTL", 900))  # how long a cursor stays valid
+SEARCH_PAGE_MAX_SETS = int(os.getenv("SEARCH_PAGE_MAX_SETS", 1000))
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+# Result sets being paged through: id -> (ListingTable, selected rows).
+# Rows are only references into the table, so a set costs a few bytes per listing.
+result_sets = TTLCache(MemoryBackend(max_entries=SEARCH_PAGE_MAX_SETS), ttl=SEARCH_PAGE_TTL, name="search-pages")
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def encode_cursor(set_id, offset, page_size, fields):
+    state = {"s": set_id, "o": offset, "n": page_size, "f": fields}
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    (set_id, offset, page_size, fields) from a cursor; ValueError if it's malformed.
+    Cursors come back from clients, so every field is checked the way the
+    query parameters are: the page size is clamped and the fields must exist.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        set_id, offset, page_size, fields = state["s"], int(state["o"]), page_size_from(state["n"]), state["f"]
+        if not isinstance(set_id, str) or offset < 0:
+            raise ValueError("bad set id or offset")
+        if fields:
+            if not isinstance(fields, list) or any(field not in LISTING_FIELDS for field in fields):
+                raise ValueError("bad fields")
+            fields = tuple(fields)
+        return set_id, offset, page_size, fields or None
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def page_size_from(value):
+    """Requested page size, clamped to 1..MAX_PAGE_SIZE"""
+    return max(1, min(int(value), MAX_PAGE_SIZE))
+
+
+def first_page(table, rows, page_size, fields=None):
+    """Store a new result set and return its first page"""
+    set_id = uuid.uuid4().hex
+    result_sets.set(set_id, (table, rows))
+    return _page(set_id, table, rows, 0, page_size, fields)
+
+
+def next_page(cursor, page_size=None, fields=None):
+    """
+    The page a cursor points at, always from the same result set as the
+    first page. page_size and fields default to what the cursor carries.
+    Raises ValueError for a bad cursor and CursorExpired once its set is gone.
+    """
+    set_id, offset, cursor_page_size, cursor_fields = decode_cursor(cursor)
+    result_set = result_sets.get(set_id)
+    if result_set is None:
+        raise CursorExpired("Cursor expired, please run the search again")
+    table, rows = result_set
+    return _page(set_id, table, rows, offset, page_size or cursor_page_size, fields or cursor_fields)
+
+
+def _page(set_id, table, rows, offset, page_size, fields):
+    page_rows = rows[offset:offset + page_size]
+    end = offset + len(page_rows)
+    return {
+        "results": [table.listing_info(row, fields) for row in page_rows],
+        "total": len(rows),
+        "offset": offset,
+        "page_size": page_size,
+        "next_cursor": encode_cursor(set_id, end, page_size, fields) if end < len(rows) else None,
+    }
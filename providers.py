@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pyairbnb
+
+import travel
+from claude_client import CLAUDE_API_KEY, ClaudeAPIError, post_message as claude_post_message
+
+# Upstream provider configuration (override through environment variables)
+#   live:   pyairbnb, Momondo and the Claude API
+#   record: live, and every successful answer is saved under REPLAY_DIR
+#   replay: answers come from REPLAY_DIR and the bundled fixtures, nothing leaves the box
+TRAVEL_PROVIDER = os.getenv("TRAVEL_PROVIDER", "live").lower()
+REPLAY_DIR = os.getenv("REPLAY_DIR", "recordings")
+REPLAY_SEARCH_FIXTURE = os.getenv("REPLAY_SEARCH_FIXTURE", "search_results.json")
+REPLAY_REVIEWS_FIXTURE = os.getenv("REPLAY_REVIEWS_FIXTURE", "reviews.json")
+REPLAY_LATENCY = float(os.getenv("REPLAY_LATENCY", 0))  # seconds added to every replayed call
+
+# Routes skip the LLM without an API key; replay answers from recordings instead
+LLM_AVAILABLE = bool(CLAUDE_API_KEY) or TRAVEL_PROVIDER == "replay"
+
+# Never part of a recording key: they don't change the answer
+_IGNORED_PARAMS = ("proxy_url", "pool")
+
+
+def recording_key(kind, call):
+    """Stable id for one upstream call (kind plus its JSON-able arguments)"""
+    call = {name: value for name, value in call.items() if name not in _IGNORED_PARAMS}
+    encoded = json.dumps([kind, call], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:24]
+
+
+def _search_call(check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency):
+    # Tile bounds carry float noise (40.82000000000001); 6 decimals is ~10 cm
+    return {
+        "check_in": check_in,
+        "check_out": check_out,
+        "bbox": [round(float(value), 6) for value in (ne_lat, ne_long, sw_lat, sw_long)],
+        "zoom": zoom_value,
+        "currency": currency,
+    }
+
+
+def _scrape_call(params):
+    # Keyed like the flight cache, so "jfk " and "JFK" or a reordered
+    # children_ages list replay the same recording
+    return {"search": travel.scrape_cache_key(**params)}
+
+
+class Recordings:
+    """
+    Recorded upstream answers, one JSON file per call:
+    REPLAY_DIR/<kind>/<key>.json holding the call, the answer and when it was recorded.
+    Files are read once and kept in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.loaded = {}
+        self.lock = threading.Lock()
+
+    def _path(self, kind, key):
+        return os.path.join(self.directory, kind, f"{key}.json")
+
+    def get(self, kind, call):
+        """The recorded answer, or None when this call was never recorded"""
+        key = recording_key(kind, call)
+        with self.lock:
+            if (kind, key) in self.loaded:
+                return self.loaded[(kind, key)]
+        try:
+            with open(self._path(kind, key)) as f:
+                answer = json.load(f)["response"]
+        except FileNotFoundError:
+            answer = None
+        with self.lock:
+            self.loaded[(kind, key)] = answer
+        return answer
+
+    def save(self, kind, call, answer):
+        key = recording_key(kind, call)
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"kind": kind, "call": call, "response": answer, "recorded_at": time.time()}
+        # Written to a temp file first so a concurrent replay never reads half a recording
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(record, f, default=str)
+        os.replace(temp_path, path)
+        with self.lock:
+            self.loaded[(kind, key)] = answer
+        print(f"Recorded {kind} call {key}")
+
+
+class LiveProvider:
+    """The real upstreams"""
+
+    name = "live"
+
+    def search_all(self, check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url=""):
+        return pyairbnb.search_all(
+            check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url
+        )
+
+    def get_reviews(self, room_url, proxy_url=""):
+        return pyairbnb.get_reviews(room_url, proxy_url)
+
+    def scrape_momondo(self, **params):
+        return travel.scrape_momondo(**params)
+
+    def scrape_momondo_results(self, **params):
+        return travel.scrape_momondo_results(**params)
+
+    def post_message(self, payload):
+        return claude_post_message(payload)
+
+
+class RecordingProvider(LiveProvider):
+    """Live, saving every successful answer (failed scrapes and errors aren't recorded)"""
+
+    name = "record"
+
+    def __init__(self, recordings):
+        self.recordings = recordings
+
+    def _record(self, kind, call, answer):
+        if answer is not None:
+            self.recordings.save(kind, call, answer)
+        return answer
+
+    def search_all(self, check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url=""):
+        answer = super().search_all(
+            check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url
+        )
+        call = _search_call(check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency)
+        return self._record("search", call, answer)
+
+    def get_reviews(self, room_url, proxy_url=""):
+        return self._record("reviews", {"room_url": room_url}, super().get_reviews(room_url, proxy_url))
+
+    def scrape_momondo(self, **params):
+        return self._record("scrape", _scrape_call(params), super().scrape_momondo(**params))
+
+    def scrape_momondo_results(self, **params):
+        answer = super().scrape_momondo_results(**params)
+        return self._record("scrape_results", _scrape_call({"max_results": 5, **params}), answer)
+
+    def post_message(self, payload):
+        return self._record("llm", payload, super().post_message(payload))
+
+
+class ReplayProvider:
+    """
+    Answers from recordings only, failing the way the live upstream would
+    when a call wasn't recorded: searches and reviews fall back to the
+    bundled fixtures, scrapes return None (a failed scrape) and LLM calls
+    raise ClaudeAPIError.
+    """
+
+    name = "replay"
+
+    def __init__(self, recordings, search_fixture, reviews_fixture, latency=0):
+        self.recordings = recordings
+        self.search_fixture = search_fixture
+        self.reviews_fixture = reviews_fixture
+        self.latency = latency
+        self.fixtures = {}
+        self.lock = threading.Lock()
+
+    def _fixture(self, path):
+        with self.lock:
+            if path not in self.fixtures:
+                with open(path) as f:
+                    self.fixtures[path] = json.load(f)
+            return self.fixtures[path]
+
+    def _replay(self, kind, call):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.recordings.get(kind, call)
+
+    def search_all(self, check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url=""):
+        call = _search_call(check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency)
+        answer = self._replay("search", call)
+        if answer is not None:
+            return answer
+        # Like a real search, only the fixture listings inside the bounding box
+        # (search_results.json covers midtown Manhattan, /search's default area)
+        listings = []
+        for listing in self._fixture(self.search_fixture):
+            coordinates = listing.get("coordinates") or {}
+            lat = coordinates.get("latitude")
+            long = coordinates.get("longitud", coordinates.get("longitude"))
+            if lat is not None and long is not None and sw_lat <= lat <= ne_lat and sw_long <= long <= ne_long:
+                listings.append(listing)
+        return listings
+
+    def get_reviews(self, room_url, proxy_url=""):
+        answer = self._replay("reviews", {"room_url": room_url})
+        # Every unrecorded listing gets the fixture reviews
+        return answer if answer is not None else self._fixture(self.reviews_fixture)
+
+    def scrape_momondo(self, **params):
+        call = _scrape_call(params)
+        answer = self._replay("scrape", call)
+        if answer is None:
+            print(f"Replay: no recorded scrape for {call['search']}")
+        return answer
+
+    def scrape_momondo_results(self, **params):
+        call = _scrape_call({"max_results": 5, **params})
+        answer = self._replay("scrape_results", call)
+        if answer is None:
+            print(f"Replay: no recorded scrape results for {call['search']}")
+        return answer
+
+    def post_message(self, payload):
+        answer = self._replay("llm", payload)
+        if answer is None:
+            raise ClaudeAPIError(
+                f"Replay: no recorded answer for this request (key {recording_key('llm', payload)})",
+                status_code=404,
+            )
+        return answer
+
+
+def make_provider(kind="live", directory=REPLAY_DIR):
+    """Build a provider by name ("live", "record" or "replay")."""
+    if kind == "live":
+        return LiveProvider()
+    if kind == "record":
+        return RecordingProvider(Recordings(directory))
+    if kind == "replay":
+        return ReplayProvider(
+            Recordings(directory), REPLAY_SEARCH_FIXTURE, REPLAY_REVIEWS_FIXTURE, REPLAY_LATENCY
+        )
+    raise ValueError(f"Unknown travel provider: {kind}")
+
+
+provider = make_provider(TRAVEL_PROVIDER)
+if provider.name != "live":
+    print(f"Travel provider: {provider.name} ({REPLAY_DIR})")
+
+
+# Module-level entry points used across the app, in place of the upstream functions
+
+
+def search_all(check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url=""):
+    return provider.search_all(
+        check_in, check_out, ne_lat, ne_long, sw_lat, sw_long, zoom_value, currency, proxy_url
+    )
+
+
+def get_reviews(room_url, proxy_url=""):
+    return provider.get_reviews(room_url, proxy_url)
+
+
+def scrape_momondo(**params):
+    return provider.scrape_momondo(**params)
+
+
+def scrape_momondo_results(**params):
+    return provider.scrape_momondo_results(**params)
+
+
+def post_message(payload):
+    return provider.post_message(payload)
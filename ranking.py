@@ -0,0 +1,280 @@
+import heapq
+import itertools
+import math
+import os
+
+import numpy as np
+
+from review_analysis import analyze_reviews_batch
+from review_fetcher import MAX_LISTINGS_TO_RANK, REVIEW_FETCH_WORKERS, iter_listing_reviews
+
+# How many recommendations we return
+TOP_K = 3
+
+# Listings whose reviews get the expensive (Claude) analysis, at most, per request
+DEEP_ANALYSIS_BUDGET = int(os.getenv("DEEP_ANALYSIS_BUDGET", MAX_LISTINGS_TO_RANK))
+
+# Listings scored on cheap signals, at most, per request
+MAX_RANKING_CANDIDATES = int(os.getenv("MAX_RANKING_CANDIDATES", 500))
+
+# Reviews analyzed per listing
+REVIEWS_PER_LISTING = 3
+
+# Cheap prior: each signal is scaled to 0..1 and weighted, so the prior is 0..10
+PRIOR_WEIGHTS = {"rating": 4, "review_count": 2, "price": 2, "name_keywords": 2}
+RATING_FLOOR = 3.5  # ratings at or below this add nothing
+REVIEW_COUNT_SATURATION = 200  # more reviews than this add nothing
+
+# Review score: sentiment (-1..1) x 5 plus share of user keywords matched (0..1) x 10
+SENTIMENT_WEIGHT = 5
+KEYWORD_WEIGHT = 10
+DEEP_SCORE_MAX = SENTIMENT_WEIGHT + KEYWORD_WEIGHT
+
+# Score for a listing whose reviews couldn't be processed
+ERROR_SCORE = -100
+
+
+def prior_scores(table, rows, user_keywords, min_price, max_price):
+    """Cheap 0..10 score per row from rating, review count, price and name keyword hits"""
+    rating = np.nan_to_num(table.rating[rows], nan=0.0)
+    rating_part = np.clip((rating - RATING_FLOOR) / (5 - RATING_FLOOR), 0, 1)
+
+    review_count = np.nan_to_num(table.review_count[rows], nan=0.0)
+    review_part = np.clip(np.log1p(review_count) / math.log1p(REVIEW_COUNT_SATURATION), 0, 1)
+
+    # Cheaper within the requested range is better
+    price = table.price[rows]
+    span = max_price - min_price
+    if span > 0 and math.isfinite(span):
+        price_part = np.clip((max_price - price) / span, 0, 1)
+    else:
+        price_part = np.full(len(rows), 0.5)
+    price_part = np.nan_to_num(price_part, nan=0.0)
+
+    name_part = np.zeros(len(rows))
+    if user_keywords:
+        for position, row in enumerate(rows):
+            name = (table.listings[row].name or "").lower()
+            name_part[position] = sum(keyword in name for keyword in user_keywords) / len(user_keywords)
+
+    return (
+        PRIOR_WEIGHTS["rating"] * rating_part
+        + PRIOR_WEIGHTS["review_count"] * review_part
+        + PRIOR_WEIGHTS["price"] * price_part
+        + PRIOR_WEIGHTS["name_keywords"] * name_part
+    )
+
+
+def review_score(reviews, user_keywords, analyze_sentiment, extract_keywords):
+    """Expensive part: sentiment and keywords of a listing's first reviews"""
+    reviews_with_comments = [review for review in reviews[:REVIEWS_PER_LISTING] if review.comments]
+
+    # Sentiment and keywords for all of this listing's reviews in one Claude call
+    # (reviews analyzed before come straight from the review cache)
+    analyses = analyze_reviews_batch(
+        [review.comments for review in reviews_with_comments],
+        analyze_sentiment,
+        extract_keywords,
+        review_ids=[review.id for review in reviews_with_comments],
+        ratings=[review.rating for review in reviews_with_comments],
+    )
+
+    sentiment_score = 0
+    keyword_matches = 0
+    matched = set()
+    for analysis in analyses:
+        if analysis["sentiment"] == "POSITIVE":
+            sentiment_score += 1
+        elif analysis["sentiment"] == "NEGATIVE":
+            sentiment_score -= 1
+
+        # User keywords found among this review's keywords (case-insensitive;
+        # "host" counts for "friendly host" and the other way round)
+        keywords_lower = [keyword.lower() for keyword in analysis["keywords"]]
+        for user_keyword in user_keywords:
+            for keyword in keywords_lower:
+                if user_keyword in keyword or keyword in user_keyword:
+                    keyword_matches += 1
+                    matched.add(user_keyword)
+                    break
+
+    # If no reviews, give a neutral score
+    review_count = len(analyses)
+    score = 0
+    if review_count:
+        score += SENTIMENT_WEIGHT * sentiment_score / review_count
+        if user_keywords:
+            score += KEYWORD_WEIGHT * len(matched) / len(user_keywords)
+
+    return {
+        "score": score,
+        "sentiment_score": sentiment_score,
+        "keyword_matches": keyword_matches,
+        "review_count": review_count,
+    }
+
+
+def iter_top_k(
+    table,
+    mask,
+    user_keywords,
+    analyze_sentiment,
+    extract_keywords,
+    min_price,
+    max_price,
+    top_k=TOP_K,
+    budget=DEEP_ANALYSIS_BUDGET,
+    penalize_fetch_errors=True,
+):
+    """
+    Rank the rows selected by mask, yielding ("final", entry) for each of
+    the top_k in rank order as soon as no unscored candidate could still
+    outrank it, then ("done", stats).
+
+    Every candidate gets a cheap prior score. Candidates are then fetched
+    and analyzed in prior order, a few at a time, while a bounded heap
+    keeps the current top_k. The final score is prior + review score, and
+    the review score can't exceed DEEP_SCORE_MAX, so once a candidate's
+    prior + DEEP_SCORE_MAX can't beat the k-th best score, neither it nor
+    anything after it can. At most budget listings get review analysis.
+
+    With penalize_fetch_errors a listing whose reviews can't be fetched is
+    kept with ERROR_SCORE; otherwise it's scored as having no reviews.
+    """
+    # Raw search_all answers (the cache bypass) can list a room twice; rank each room once
+    unique_rows = []
+    seen = set()
+    for row in table.rows(mask):
+        room_id = table.listings[row].room_id
+        if room_id not in seen:
+            seen.add(room_id)
+            unique_rows.append(row)
+    rows = np.array(unique_rows[:MAX_RANKING_CANDIDATES], dtype=np.intp)
+    user_keywords = [keyword.lower() for keyword in user_keywords]
+    priors = prior_scores(table, rows, user_keywords, min_price, max_price)
+    order = np.argsort(-priors, kind="stable")
+
+    heap = []  # min-heap of (score, sequence, entry), never more than top_k long
+    sequence = itertools.count()
+    stats = {"candidates": len(rows), "analyzed": 0, "skipped": 0, "terminated_early": False}
+    position = 0
+    pending = {}  # listing id -> prior, for the batch being fetched
+    emitted = 0
+
+    def threshold():
+        return heap[0][0] if len(heap) == top_k else -math.inf
+
+    def push(entry):
+        item = (entry["score"], -next(sequence), entry)
+        if len(heap) < top_k:
+            heapq.heappush(heap, item)
+        elif item[0] > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def unscored_bound(finished=False):
+        """Best score any candidate not scored yet could still reach"""
+        if finished:
+            return -math.inf
+        bound = max(pending.values()) + DEEP_SCORE_MAX if pending else -math.inf
+        if position < len(order) and stats["analyzed"] < budget and not stats["terminated_early"]:
+            bound = max(bound, priors[order[position]] + DEEP_SCORE_MAX)
+        return bound
+
+    def newly_final(finished=False):
+        nonlocal emitted
+        # Highest score first; ties keep the order they were scored in
+        ranked = [entry for _, _, entry in sorted(heap, key=lambda item: item[:2], reverse=True)]
+        bound = unscored_bound(finished)
+        final = []
+        while emitted < len(ranked) and ranked[emitted]["score"] >= bound:
+            final.append(ranked[emitted])
+            emitted += 1
+        return final
+
+    while position < len(order) and stats["analyzed"] < budget:
+        # Candidates come in prior order: once one can't reach the top K, none after it can
+        if priors[order[position]] + DEEP_SCORE_MAX <= threshold():
+            stats["terminated_early"] = True
+            break
+
+        batch = order[position:position + min(REVIEW_FETCH_WORKERS, budget - stats["analyzed"])]
+        position += len(batch)
+        listings = [table.listing_info(rows[index]) for index in batch]
+        pending = {listing["id"]: float(priors[index]) for listing, index in zip(listings, batch)}
+
+        # Reviews are fetched concurrently; score each listing as soon as its reviews arrive
+        for listing, reviews, fetch_error in iter_listing_reviews(listings):
+            prior = pending.pop(listing["id"])
+            try:
+                if fetch_error is not None:
+                    if penalize_fetch_errors:
+                        raise fetch_error
+                    print(f"Error retrieving reviews for listing {listing['id']}: {str(fetch_error)}")
+                else:
+                    print(f"Retrieved {len(reviews)} reviews for listing {listing['id']}")
+
+                # The top K may have moved on while these reviews were loading
+                if prior + DEEP_SCORE_MAX <= threshold():
+                    stats["skipped"] += 1
+                    continue
+
+                stats["analyzed"] += 1
+                result = review_score(
+                    reviews, user_keywords, analyze_sentiment, extract_keywords
+                )
+                push({
+                    "listing": listing,
+                    "score": prior + result["score"],
+                    "prior_score": prior,
+                    "sentiment_score": result["sentiment_score"],
+                    "keyword_matches": result["keyword_matches"],
+                    "review_count": result["review_count"],
+                })
+
+            except Exception as e:
+                print(f"Error processing listing {listing['id']}: {str(e)}")
+                # Still add the listing but with a very low score
+                stats["analyzed"] += 1
+                push({"listing": listing, "score": ERROR_SCORE, "error": str(e)})
+
+            for entry in newly_final():
+                yield "final", entry
+
+    print(
+        f"Ranking: {stats['candidates']} candidates, {stats['analyzed']} analyzed, "
+        f"{stats['skipped']} skipped, stopped early: {stats['terminated_early']}"
+    )
+    for entry in newly_final(finished=True):
+        yield "final", entry
+    yield "done", stats
+
+
+def rank_top_k(*args, **kwargs):
+    """Best top_k listings, highest score first, and the ranking stats (see iter_top_k)"""
+    top_listings = []
+    stats = None
+    for kind, payload in iter_top_k(*args, **kwargs):
+        if kind == "final":
+            top_listings.append(payload)
+        else:
+            stats = payload
+    return top_listings, stats
+
+
+def format_recommendation(item):
+    """Response dict for one ranked listing"""
+    listing_data = item["listing"]
+    return {
+        "id": listing_data["id"],
+        "name": listing_data["name"],
+        "url": listing_data["url"],
+        "price": listing_data["price"],
+        "rating": listing_data["rating"],
+        "image_urls": listing_data["image_urls"][:1],  # Just the first image to keep response smaller
+        "score": item["score"],
+        "match_reasons": {
+            "sentiment_score": item.get("sentiment_score", 0),
+            "keyword_matches": item.get("keyword_matches", 0),
+            "prior_score": round(item.get("prior_score", 0), 3),
+        },
+    }
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-step timeouts in milliseconds (override through environment variables)
+STEP_TIMEOUTS = {
+    "navigate": int(os.getenv("READY_NAVIGATE_TIMEOUT_MS", 60000)),
+    "results": int(os.getenv("READY_RESULTS_TIMEOUT_MS", 30000)),
+    "xhr_settle": int(os.getenv("READY_XHR_TIMEOUT_MS", 15000)),
+    "dom_settle": int(os.getenv("READY_DOM_TIMEOUT_MS", 5000)),
+}
+
+# How long the page must stay quiet before we call it settled
+XHR_QUIET_MS = int(os.getenv("READY_XHR_QUIET_MS", 1500))
+DOM_QUIET_MS = int(os.getenv("READY_DOM_QUIET_MS", 500))
+
+# Momondo fetches results through repeated polling XHRs
+RESULTS_XHR_PATTERN = "/search/dynamic/flights/poll"
+
+# Running totals of time spent per phase, across all scrapes
+_phase_totals = {}
+_phase_lock = threading.Lock()
+
+
+class PhaseTimer:
+    """Records how long each phase of a scrape takes."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+            with _phase_lock:
+                count, total = _phase_totals.get(name, (0, 0.0))
+                _phase_totals[name] = (count + 1, total + elapsed)
+
+    def summary(self):
+        return ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.timings.items())
+
+
+def phase_stats():
+    """Average seconds spent in each phase since the process started."""
+    with _phase_lock:
+        return {
+            name: {"count": count, "avg_seconds": round(total / count, 3)}
+            for name, (count, total) in _phase_totals.items()
+        }
+
+
+class ResponseTracker:
+    """Watches a page for responses whose URL contains a pattern."""
+
+    def __init__(self, page, pattern=RESULTS_XHR_PATTERN):
+        self.pattern = pattern
+        self.count = 0
+        self.last_seen = None
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if self.pattern in response.url:
+            self.count += 1
+            self.last_seen = time.monotonic()
+
+
+def wait_for_xhr_settled(page, tracker, quiet_ms=XHR_QUIET_MS, timeout_ms=None):
+    """
+    Wait until the results XHRs have stopped arriving for quiet_ms.
+    The quiet window counts from the last matching XHR, or from the start of
+    the wait if none has been seen, so a page that never polls (or polls a
+    URL the pattern doesn't match) is settled after quiet_ms, not the timeout.
+    Returns False if the page never went quiet within the timeout.
+    """
+    timeout_ms = timeout_ms or STEP_TIMEOUTS["xhr_settle"]
+    start = time.monotonic()
+    deadline = start + timeout_ms / 1000
+
+    while time.monotonic() < deadline:
+        last_seen = tracker.last_seen if tracker.last_seen is not None else start
+        if (time.monotonic() - last_seen) * 1000 >= quiet_ms:
+            return True
+        # wait_for_timeout keeps Playwright's event loop running, unlike time.sleep
+        page.wait_for_timeout(100)
+    return False
+
+
+_DOM_SETTLED_JS = """
+({quietMs, timeoutMs}) => new Promise((resolve) => {
+    let quietTimer;
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardTimer);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    const hardTimer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+
+def wait_for_dom_settled(page, quiet_ms=DOM_QUIET_MS, timeout_ms=None):
+    """
+    Wait until the DOM has had no mutations for quiet_ms.
+    Returns False if it was still changing when the timeout hit.
+    """
+    timeout_ms = timeout_ms or STEP_TIMEOUTS["dom_settle"]
+    return page.evaluate(_DOM_SETTLED_JS, {"quietMs": quiet_ms, "timeoutMs": timeout_ms})
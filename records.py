@@ -0,0 +1,140 @@
+import json
+import os
+import zlib
+
+# Keep each record's full original payload (compressed) so .raw works. Off by default:
+# nothing reads .raw, and packing costs ~20x the rest of ingest (288 ms vs 14 ms per 5,600 listings)
+RECORDS_KEEP_RAW = os.getenv("RECORDS_KEEP_RAW", "false").lower() == "true"
+
+
+def _pack(payload):
+    if not RECORDS_KEEP_RAW:
+        return None
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(packed):
+    if packed is None:
+        return None
+    return json.loads(zlib.decompress(packed))
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ListingRecord:
+    """
+    The fields we use from one search_all listing.
+
+    Everything else (badges, fees, price breakdown, ...) is dropped, or with
+    RECORDS_KEEP_RAW kept as compressed JSON and only decoded when .raw is read.
+    """
+
+    __slots__ = (
+        "room_id", "name", "category", "price", "rating", "review_count",
+        "lat", "long", "image_urls", "_raw",
+    )
+
+    def __init__(self, room_id, name, category, price, rating, review_count, lat, long, image_urls, raw=None):
+        self.room_id = room_id
+        self.name = name
+        self.category = category
+        self.price = price
+        self.rating = rating
+        self.review_count = review_count
+        self.lat = lat
+        self.long = long
+        self.image_urls = image_urls
+        self._raw = raw
+
+    @classmethod
+    def from_search_result(cls, listing):
+        rating = listing.get("rating") or {}
+        coordinates = listing.get("coordinates") or {}
+        return cls(
+            room_id=listing.get("room_id"),
+            name=listing.get("name"),
+            category=listing.get("category"),
+            price=_number((listing.get("price") or {}).get("total", {}).get("amount")),
+            rating=_number(rating.get("value")),
+            review_count=_number(rating.get("reviewCount")),
+            lat=_number(coordinates.get("latitude")),
+            # pyairbnb spells it "longitud"
+            long=_number(coordinates.get("longitud", coordinates.get("longitude"))),
+            image_urls=tuple(image["url"] for image in listing.get("images", [])),
+            raw=_pack(listing),
+        )
+
+    @property
+    def raw(self):
+        """The original search_all dict (decoded on every access; None unless RECORDS_KEEP_RAW)"""
+        return _unpack(self._raw)
+
+    def __repr__(self):
+        return f"ListingRecord(room_id={self.room_id!r}, name={self.name!r}, price={self.price!r})"
+
+
+class ReviewRecord:
+    """
+    The fields we use from one get_reviews entry: id, comments, rating and createdAt.
+    The reviewer/reviewee objects and the rest are dropped (or kept compressed with RECORDS_KEEP_RAW).
+    """
+
+    __slots__ = ("id", "comments", "rating", "created_at", "_raw")
+
+    def __init__(self, id, comments, rating, created_at, raw=None):
+        self.id = id
+        self.comments = comments
+        self.rating = rating
+        self.created_at = created_at
+        self._raw = raw
+
+    @classmethod
+    def from_review(cls, review):
+        return cls(
+            id=review.get("id"),
+            comments=review.get("comments") or "",
+            rating=review.get("rating"),
+            created_at=review.get("createdAt"),
+            raw=_pack(review),
+        )
+
+    @property
+    def raw(self):
+        """The original review dict (decoded on every access; None unless RECORDS_KEEP_RAW)"""
+        return _unpack(self._raw)
+
+    def __repr__(self):
+        return f"ReviewRecord(id={self.id!r}, rating={self.rating!r})"
+
+
+def listing_records(listings):
+    """ListingRecords for search_all output (records passed in are kept as they are)"""
+    return [
+        listing if isinstance(listing, ListingRecord) else ListingRecord.from_search_result(listing)
+        for listing in listings
+    ]
+
+
+def review_records(reviews):
+    """ReviewRecords for get_reviews output (records passed in are kept as they are)"""
+    return [
+        review if isinstance(review, ReviewRecord) else ReviewRecord.from_review(review)
+        for review in reviews
+    ]
+
+
+def load_listings(path):
+    """ListingRecords from a saved search_all JSON file such as search_results.json"""
+    with open(path) as f:
+        return listing_records(json.load(f))
+
+
+def load_reviews(path):
+    """ReviewRecords from a saved get_reviews JSON file such as reviews.json"""
+    with open(path) as f:
+        return review_records(json.load(f))
@@ -0,0 +1,113 @@
+import os
+import re
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from browser_pool import USER_AGENT
+
+MAX_REDIRECT_HOPS = int(os.getenv("REDIRECT_MAX_HOPS", 10))
+REDIRECT_TIMEOUT = (
+    float(os.getenv("REDIRECT_CONNECT_TIMEOUT", 5)),
+    float(os.getenv("REDIRECT_READ_TIMEOUT", 10)),
+)
+
+# How much of a 200 response we look at for meta/JS redirects
+MAX_BODY_BYTES = 65536
+
+# While we're still on these hosts, a 200 page may just be a JS hop
+MOMONDO_HOSTS = ("momondo.com", "kayak.com")
+
+_META_REFRESH_RE = re.compile(
+    r"""<meta[^>]+http-equiv=["']?refresh["']?[^>]+content=["']?\d+\s*;\s*url=([^"'>\s]+)""",
+    re.IGNORECASE,
+)
+_JS_REDIRECT_RE = re.compile(
+    r"(window\.location|document\.location|location\.href|location\.replace|location\.assign)",
+    re.IGNORECASE,
+)
+
+# Shared keep-alive session. Cookies are passed per request, so the
+# session's own jar is told to ignore Set-Cookie from every response.
+http_session = requests.Session()
+http_session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20)
+http_session.mount("https://", _adapter)
+http_session.mount("http://", _adapter)
+
+
+def _on_momondo(url):
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == h or host.endswith("." + h) for h in MOMONDO_HOSTS)
+
+
+def _cookie_jar(browser_cookies):
+    """Convert Playwright context.cookies() output into a requests jar"""
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in browser_cookies or []:
+        jar.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+        )
+    return jar
+
+
+def resolve_redirect(url, browser_cookies=None, user_agent=USER_AGENT):
+    """
+    Follow a booking URL's redirect chain over plain HTTP.
+
+    Returns the final URL, or None when the chain needs a real browser
+    (a JavaScript redirect, an error status, or too many hops).
+    """
+    jar = _cookie_jar(browser_cookies)
+    headers = {"User-Agent": user_agent, "Accept": "text/html,application/xhtml+xml"}
+    current = url
+
+    for _ in range(MAX_REDIRECT_HOPS):
+        response = http_session.get(
+            current,
+            headers=headers,
+            cookies=jar,
+            allow_redirects=False,
+            timeout=REDIRECT_TIMEOUT,
+            stream=True,
+        )
+        try:
+            # Keep cookies set along the way, like a browser would
+            jar.update(response.cookies)
+
+            if response.is_redirect:
+                current = urljoin(current, response.headers["location"])
+                continue
+
+            if response.status_code >= 400:
+                print(f"Redirect chain stopped with HTTP {response.status_code} at {current}")
+                return None
+
+            if "html" not in response.headers.get("content-type", ""):
+                return current
+
+            body = response.raw.read(MAX_BODY_BYTES, decode_content=True).decode(
+                response.encoding or "utf-8", errors="replace"
+            )
+
+            meta_refresh = _META_REFRESH_RE.search(body)
+            if meta_refresh:
+                current = urljoin(current, meta_refresh.group(1))
+                continue
+
+            # A 200 page still on Momondo with a script redirect needs a browser
+            if _on_momondo(current) and _JS_REDIRECT_RE.search(body):
+                print(f"JavaScript redirect detected at {current}")
+                return None
+
+            return current
+        finally:
+            response.close()
+
+    print(f"Too many redirects resolving {url}")
+    return None
@@ -0,0 +1,134 @@
+import os
+import threading
+from urllib.parse import urlparse
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return set(default)
+    return {item.strip().lower() for item in value.split(",") if item.strip()}
+
+
+# Resource types we never need to find the booking links
+BLOCKED_RESOURCE_TYPES = _env_list("SCRAPER_BLOCK_TYPES", ["image", "font", "media"])
+
+# Ad, analytics and tracking hosts (subdomains are matched too)
+BLOCKED_HOSTS = _env_list(
+    "SCRAPER_BLOCK_HOSTS",
+    [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googlesyndication.com",
+        "googleadservices.com",
+        "doubleclick.net",
+        "adservice.google.com",
+        "facebook.net",
+        "facebook.com",
+        "connect.facebook.net",
+        "bat.bing.com",
+        "hotjar.com",
+        "criteo.com",
+        "criteo.net",
+        "taboola.com",
+        "outbrain.com",
+        "scorecardresearch.com",
+        "quantserve.com",
+        "adsrvr.org",
+        "amazon-adsystem.com",
+        "branch.io",
+        "onetrust.com",
+        "cookielaw.org",
+        "newrelic.com",
+        "nr-data.net",
+    ],
+)
+
+# Hosts that are always let through, whatever their resource type
+ALLOWED_HOSTS = _env_list("SCRAPER_ALLOW_HOSTS", [])
+
+# Rough average transfer size per blocked request, used to estimate savings
+ESTIMATED_BYTES = {
+    "image": 40000,
+    "font": 30000,
+    "media": 200000,
+    "stylesheet": 20000,
+    "script": 60000,
+}
+DEFAULT_ESTIMATED_BYTES = 10000
+
+# Totals across all scrapes since the process started
+_totals = {"requests": 0, "blocked": 0, "bytes_loaded": 0, "estimated_bytes_saved": 0}
+_totals_lock = threading.Lock()
+
+
+def _host_matches(host, hosts):
+    return any(host == h or host.endswith("." + h) for h in hosts)
+
+
+class ResourceStats:
+    """Request counters for a single scrape."""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.bytes_loaded = 0
+        self.estimated_bytes_saved = 0
+
+    def summary(self):
+        return (
+            f"{self.blocked}/{self.requests} requests blocked, "
+            f"~{self.estimated_bytes_saved // 1024} KB saved, "
+            f"{self.bytes_loaded // 1024} KB loaded, by type {self.blocked_by_type}"
+        )
+
+    def flush(self):
+        """Add this scrape's numbers to the process-wide totals."""
+        with _totals_lock:
+            _totals["requests"] += self.requests
+            _totals["blocked"] += self.blocked
+            _totals["bytes_loaded"] += self.bytes_loaded
+            _totals["estimated_bytes_saved"] += self.estimated_bytes_saved
+
+
+def resource_stats():
+    with _totals_lock:
+        return dict(_totals)
+
+
+def should_block(url, resource_type):
+    host = (urlparse(url).hostname or "").lower()
+    if _host_matches(host, ALLOWED_HOSTS):
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    return _host_matches(host, BLOCKED_HOSTS)
+
+
+def install_resource_filter(context):
+    """
+    Abort heavy and third-party requests on a browser context.
+    Returns the ResourceStats object that collects this context's numbers.
+    """
+    stats = ResourceStats()
+
+    def handle_route(route):
+        request = route.request
+        stats.requests += 1
+        if should_block(request.url, request.resource_type):
+            stats.blocked += 1
+            stats.blocked_by_type[request.resource_type] = stats.blocked_by_type.get(request.resource_type, 0) + 1
+            stats.estimated_bytes_saved += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            route.abort("blockedbyclient")
+        else:
+            route.continue_()
+
+    def handle_response(response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            stats.bytes_loaded += int(length)
+
+    context.route("**/*", handle_route)
+    context.on("response", handle_response)
+    return stats
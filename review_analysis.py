@@ -0,0 +1,198 @@
+import json
+import os
+import sys
+import time
+
+import local_analyzer
+from claude_client import CLAUDE_API_KEY, CLAUDE_MODEL, ClaudeAPIError
+from providers import LLM_AVAILABLE, post_message
+from records import load_reviews
+from review_cache import get_cached_analysis, review_cache_key, store_analysis
+
+# Bump when the batch prompt changes, so cached answers from an old prompt aren't reused
+BATCH_PROMPT_VERSION = "batch-v1"
+
+# Largest number of reviews sent in one request
+MAX_BATCH_SIZE = int(os.getenv("REVIEW_BATCH_SIZE", 30))
+
+# "llm" sends reviews to Claude, "local" scores them on the CPU with local_analyzer.
+# local is a fallback, not a drop-in: on reviews.json it is less accurate than always
+# answering POSITIVE (see bench_review_analysis.py).
+REVIEW_ANALYZER = os.getenv("REVIEW_ANALYZER", "llm")
+
+SENTIMENTS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+
+
+def _batch_prompt(comments):
+    numbered = "\n".join(f"[{index}] {json.dumps(comment)}" for index, comment in enumerate(comments))
+    return (
+        "Analyze each of these Airbnb reviews. For every review, give its sentiment "
+        "(exactly one of POSITIVE, NEGATIVE or NEUTRAL) and 3-5 keywords about the location, "
+        "amenities, or experience.\n"
+        'Return ONLY a JSON array with one object per review, in the form '
+        '{"index": <review number>, "sentiment": "<POSITIVE|NEGATIVE|NEUTRAL>", "keywords": ["...", "..."]}, '
+        "with no other text or explanation.\n\n"
+        f"Reviews:\n{numbered}"
+    )
+
+
+def parse_batch_response(text, count):
+    """
+    Validate the model's JSON answer.
+    Returns a list with one {"sentiment", "keywords"} dict (or None when the
+    entry is missing or malformed) per review.
+    """
+    text = text.strip()
+    # Tolerate the answer being wrapped in a ```json fence
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.lower().startswith("json"):
+            text = text[4:]
+
+    parsed = [None] * count
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        return parsed
+    if not isinstance(items, list):
+        return parsed
+
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index")
+        sentiment = str(item.get("sentiment", "")).strip().upper()
+        keywords = item.get("keywords")
+        if not isinstance(index, int) or not 0 <= index < count:
+            continue
+        if sentiment not in SENTIMENTS:
+            continue
+        if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+            continue
+        parsed[index] = {
+            "sentiment": sentiment,
+            "keywords": [kw.strip() for kw in keywords if kw.strip()],
+        }
+    return parsed
+
+
+def _request_batch(comments):
+    """
+    One batched analysis request. Raises ClaudeAPIError when the request
+    itself fails; entries the answer doesn't cover come back as None.
+    """
+    payload = {
+        "model": CLAUDE_MODEL,
+        "max_tokens": 100 + 60 * len(comments),
+        "messages": [{"role": "user", "content": _batch_prompt(comments)}],
+        "temperature": 0,
+    }
+
+    result = post_message(payload)
+
+    if "content" not in result or len(result["content"]) == 0:
+        print("No content found in response")
+        return [None] * len(comments)
+
+    return parse_batch_response(result["content"][0].get("text", ""), len(comments))
+
+
+def analyze_reviews_batch(comments, analyze_sentiment, extract_keywords, review_ids=None, ratings=None):
+    """
+    Sentiment and keywords for many reviews using one request per batch
+    (the reviews of one or several listings).
+
+    Returns one {"sentiment", "keywords"} dict per comment, in order.
+    With REVIEW_ANALYZER=local no remote call is made at all. Otherwise
+    cached reviews cost nothing; reviews the batch answer doesn't cover are
+    analyzed one by one with the given per-review fallbacks.
+
+    If a batch request fails outright (API down, rate limited) the per-review
+    fallbacks would only hit the same API again, so that batch and every
+    later one are scored by local_analyzer with no further remote calls.
+    local_analyzer falls back to the star ratings, when given, for reviews
+    it can't read.
+    """
+    if REVIEW_ANALYZER == "local":
+        return local_analyzer.analyze_batch(comments, ratings)
+
+    review_ids = review_ids or [None] * len(comments)
+    keys = [
+        review_cache_key(comment, CLAUDE_MODEL, BATCH_PROMPT_VERSION, review_id)
+        for comment, review_id in zip(comments, review_ids)
+    ]
+    analyses = [get_cached_analysis(key) for key in keys]
+    misses = [index for index, analysis in enumerate(analyses) if analysis is None]
+    if len(misses) < len(comments):
+        print(f"Review cache: {len(comments) - len(misses)} hits, {len(misses)} misses")
+
+    if LLM_AVAILABLE:
+        for start in range(0, len(misses), MAX_BATCH_SIZE):
+            batch = misses[start:start + MAX_BATCH_SIZE]
+            try:
+                answers = _request_batch([comments[index] for index in batch])
+            except Exception as e:
+                print(f"Error in batch review analysis, scoring {len(misses) - start} reviews locally: {str(e)}")
+                unanswered = misses[start:]
+                local = local_analyzer.analyze_batch(
+                    [comments[index] for index in unanswered],
+                    [ratings[index] for index in unanswered] if ratings else None,
+                )
+                for index, analysis in zip(unanswered, local):
+                    analyses[index] = analysis
+                break
+
+            now = time.time()
+            for index, answer in zip(batch, answers):
+                if answer is not None:
+                    analyses[index] = answer
+                    store_analysis(keys[index], answer, now)
+
+    # Per-review fallbacks only for entries a successful batch answer left out.
+    # Fallback answers aren't cached, so a later request can still get the real one
+    for index, comment in enumerate(comments):
+        if analyses[index] is None:
+            analyses[index] = {
+                "sentiment": analyze_sentiment(comment),
+                "keywords": extract_keywords(comment),
+            }
+    return analyses
+
+
+def warm_review_cache(path):
+    """Analyze every uncached review in a JSON file such as reviews.json"""
+    reviews = [review for review in load_reviews(path) if review.comments]
+
+    comments = [review.comments for review in reviews]
+    review_ids = [review.id for review in reviews]
+    keys = [
+        review_cache_key(comment, CLAUDE_MODEL, BATCH_PROMPT_VERSION, review_id)
+        for comment, review_id in zip(comments, review_ids)
+    ]
+    misses = [index for index, key in enumerate(keys) if get_cached_analysis(key) is None]
+    print(f"{len(reviews)} reviews in {path}, {len(misses)} not cached yet")
+
+    stored = 0
+    for start in range(0, len(misses), MAX_BATCH_SIZE):
+        batch = misses[start:start + MAX_BATCH_SIZE]
+        try:
+            answers = _request_batch([comments[index] for index in batch])
+        except ClaudeAPIError as e:
+            # Nothing to gain from hammering an API that's failing; rerun later
+            print(f"Stopping, batch request failed: {str(e)}")
+            break
+        now = time.time()
+        for index, answer in zip(batch, answers):
+            if answer is not None:
+                store_analysis(keys[index], answer, now)
+                stored += 1
+    print(f"Stored {stored} review analyses")
+
+
+if __name__ == "__main__":
+    # Usage: python review_analysis.py reviews.json [more.json ...]
+    if not CLAUDE_API_KEY:
+        print("API Key is missing. Please check your .env file.")
+        sys.exit(1)
+    for path in sys.argv[1:] or ["reviews.json"]:
+        warm_review_cache(path)
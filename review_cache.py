@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+from cache import make_cache_backend
+
+# Review analysis cache configuration (override through environment variables)
+REVIEW_CACHE_BACKEND = os.getenv("REVIEW_CACHE_BACKEND", "sqlite")
+REVIEW_CACHE_PATH = os.getenv("REVIEW_CACHE_PATH", "review_cache.sqlite3")
+REVIEW_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", 200000))
+
+# Reviews never change once written, so entries don't expire; the
+# backend's LRU eviction keeps the store within REVIEW_CACHE_MAX_ENTRIES.
+review_cache = make_cache_backend(REVIEW_CACHE_BACKEND, REVIEW_CACHE_PATH, REVIEW_CACHE_MAX_ENTRIES)
+
+
+def review_cache_key(comment, model, prompt_version, review_id=None):
+    """Key on the review ID when we have one, else on a hash of the text"""
+    if review_id:
+        identity = f"id:{review_id}"
+    else:
+        identity = "sha256:" + hashlib.sha256(comment.encode("utf-8")).hexdigest()
+    return f"{model}|{prompt_version}|{identity}"
+
+
+def get_cached_analysis(key):
+    entry = review_cache.get(key)
+    return entry[0] if entry is not None else None
+
+
+def store_analysis(key, analysis, stored_at):
+    review_cache.set(key, analysis, stored_at)
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import providers
+from records import review_records
+
+# Fetcher configuration (override through environment variables)
+REVIEW_FETCH_WORKERS = int(os.getenv("REVIEW_FETCH_WORKERS", 6))
+REVIEW_FETCH_TIMEOUT = float(os.getenv("REVIEW_FETCH_TIMEOUT", 20))
+REVIEW_RATE_LIMIT = float(os.getenv("REVIEW_RATE_LIMIT", 5))  # requests per second per host
+MAX_LISTINGS_TO_RANK = int(os.getenv("MAX_LISTINGS_TO_RANK", 10))
+
+_executor = ThreadPoolExecutor(max_workers=REVIEW_FETCH_WORKERS, thread_name_prefix="review-fetch")
+
+
+class ReviewFetchTimeout(Exception):
+    pass
+
+
+class RateLimiter:
+    """Token bucket shared by every thread calling the same host."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_seconds = (1 - self.tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _rate_limiter(url):
+    host = urlparse(url).hostname or ""
+    with _rate_limiters_lock:
+        if host not in _rate_limiters:
+            _rate_limiters[host] = RateLimiter(REVIEW_RATE_LIMIT)
+        return _rate_limiters[host]
+
+
+def fetch_reviews(room_url, proxy_url=""):
+    """Rate-limited pyairbnb.get_reviews, as compact ReviewRecords"""
+    _rate_limiter(room_url).acquire()
+    return review_records(providers.get_reviews(room_url, proxy_url))
+
+
+def iter_listing_reviews(listings, proxy_url="", timeout=REVIEW_FETCH_TIMEOUT):
+    """
+    Fetch reviews for many listings concurrently.
+
+    Yields (listing, reviews, error) in completion order, so callers can
+    start scoring whatever is ready. A call that runs longer than timeout
+    is reported with a ReviewFetchTimeout error and an empty review list.
+    """
+    started = {}
+
+    def fetch(listing):
+        started[listing["id"]] = time.monotonic()
+        return fetch_reviews(f"https://www.airbnb.com/rooms/{listing['id']}", proxy_url)
+
+    futures = {_executor.submit(fetch, listing): listing for listing in listings}
+    pending = set(futures)
+
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+            for future in done:
+                listing = futures[future]
+                try:
+                    yield listing, future.result(), None
+                except Exception as e:
+                    yield listing, [], e
+
+            # Give up on calls that have been running too long
+            now = time.monotonic()
+            for future in list(pending):
+                listing = futures[future]
+                start = started.get(listing["id"])
+                if start is not None and now - start > timeout:
+                    pending.discard(future)
+                    yield listing, [], ReviewFetchTimeout(
+                        f"Fetching reviews for listing {listing['id']} took longer than {timeout}s"
+                    )
+    finally:
+        # Caller stopped early: drop fetches that haven't started yet
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,166 @@
+import heapq
+import math
+import threading
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, long1, lat2, long2):
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """
+    Uniform-grid index of points keyed by id.
+
+    Points are bucketed into cells of cell_degrees on a side, so bbox,
+    radius and k-nearest queries only look at the cells near the query
+    instead of every point. Inserting an existing key moves it.
+    """
+
+    def __init__(self, cell_degrees=0.005):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.points = {}  # key -> (lat, long, item)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat, long):
+        return math.floor(lat / self.cell_degrees), math.floor(long / self.cell_degrees)
+
+    def insert(self, key, lat, long, item):
+        with self.lock:
+            self._remove(key)
+            self.points[key] = (lat, long, item)
+            self.cells.setdefault(self._cell(lat, long), set()).add(key)
+
+    def remove(self, key, item=None):
+        """Remove a key; with item, only if the key still holds that same item"""
+        with self.lock:
+            self._remove(key, item)
+
+    def _remove(self, key, item=None):
+        point = self.points.get(key)
+        if point is None or (item is not None and point[2] is not item):
+            return
+        del self.points[key]
+        cell = self._cell(point[0], point[1])
+        keys = self.cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+
+    def _cell_range(self, south, west, north, east):
+        for row in range(south, north + 1):
+            for col in range(west, east + 1):
+                keys = self.cells.get((row, col))
+                if keys:
+                    for key in keys:
+                        yield self.points[key]
+
+    def query_bbox(self, ne_lat, ne_long, sw_lat, sw_long):
+        """Items inside a bounding box"""
+        south, west = self._cell(sw_lat, sw_long)
+        north, east = self._cell(ne_lat, ne_long)
+        with self.lock:
+            return [
+                item
+                for lat, long, item in self._cell_range(south, west, north, east)
+                if sw_lat <= lat <= ne_lat and sw_long <= long <= ne_long
+            ]
+
+    def _degrees_for_km(self, lat, radius_km):
+        """Half-size in degrees (lat, long) of a box that contains a circle of radius_km"""
+        lat_degrees = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + lat_degrees)))
+        return lat_degrees, min(180.0, lat_degrees / max(cos_lat, 1e-6))
+
+    def query_radius(self, lat, long, radius_km):
+        """(distance_km, item) pairs within radius_km of a point, nearest first"""
+        lat_degrees, long_degrees = self._degrees_for_km(lat, radius_km)
+        south, west = self._cell(lat - lat_degrees, long - long_degrees)
+        north, east = self._cell(lat + lat_degrees, long + long_degrees)
+        with self.lock:
+            hits = []
+            for point_lat, point_long, item in self._cell_range(south, west, north, east):
+                distance = haversine_km(lat, long, point_lat, point_long)
+                if distance <= radius_km:
+                    hits.append((distance, item))
+        hits.sort(key=lambda hit: hit[0])
+        return hits
+
+    def nearest(self, lat, long, k, max_radius_km=None, accept=None):
+        """
+        The k nearest (distance_km, item) pairs, nearest first.
+        Items for which accept(item) is false are skipped.
+
+        Searches rings of cells outward from the query point and stops once
+        the next ring can't hold anything closer than the current k-th hit.
+        """
+        if k <= 0:
+            return []
+        center_row, center_col = self._cell(lat, long)
+        size = self.cell_degrees
+
+        def ring_min_km(ring):
+            """Lower bound on the distance to anything outside rings 0..ring-1"""
+            lat_gap = min(lat - (center_row - ring + 1) * size, (center_row + ring) * size - lat)
+            long_gap = min(long - (center_col - ring + 1) * size, (center_col + ring) * size - long)
+            # East-west degrees are narrowest at the poleward edge of the ring
+            edge_lat = min(89.0, abs(lat) + (ring + 1) * size)
+            cos_edge = max(math.cos(math.radians(edge_lat)), 1e-6)
+            return min(lat_gap, long_gap * cos_edge) * KM_PER_DEGREE
+
+        def ring_cells(ring):
+            if ring == 0:
+                yield center_row, center_col
+                return
+            for col in range(center_col - ring, center_col + ring + 1):
+                yield center_row - ring, col
+                yield center_row + ring, col
+            for row in range(center_row - ring + 1, center_row + ring):
+                yield row, center_col - ring
+                yield row, center_col + ring
+
+        with self.lock:
+            if not self.points:
+                return []
+            # Ring beyond which every cell is empty or out of range
+            rows = [row for row, _ in self.cells]
+            cols = [col for _, col in self.cells]
+            max_ring = max(
+                abs(center_row - min(rows)), abs(center_row - max(rows)),
+                abs(center_col - min(cols)), abs(center_col - max(cols)),
+            )
+            if max_radius_km is not None:
+                _, long_degrees = self._degrees_for_km(lat, max_radius_km)
+                max_ring = min(max_ring, int(long_degrees / size) + 1)
+
+            best = []  # max-heap of (-distance, tiebreak, item)
+            for ring in range(max_ring + 1):
+                if ring and len(best) == k and ring_min_km(ring) > -best[0][0]:
+                    break
+                for cell in ring_cells(ring):
+                    for key in self.cells.get(cell, ()):
+                        point_lat, point_long, item = self.points[key]
+                        distance = haversine_km(lat, long, point_lat, point_long)
+                        if max_radius_km is not None and distance > max_radius_km:
+                            continue
+                        if accept is not None and not accept(item):
+                            continue
+                        entry = (-distance, id(item), item)
+                        if len(best) < k:
+                            heapq.heappush(best, entry)
+                        elif distance < -best[0][0]:
+                            heapq.heapreplace(best, entry)
+
+        return [(-distance, item) for distance, _, item in sorted(best, reverse=True)]
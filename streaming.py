@@ -0,0 +1,47 @@
+from flask import Response
+
+from json_provider import dumps
+
+STREAM_MIMETYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def stream_format(request):
+    """
+    "ndjson" or "sse" when the client asked for a streamed response
+    (?stream=ndjson|sse, or an Accept header naming either type), else None.
+    """
+    requested = request.args.get("stream", "").lower()
+    if requested in STREAM_MIMETYPES:
+        return requested
+    accept = request.headers.get("Accept", "")
+    for fmt, mimetype in STREAM_MIMETYPES.items():
+        if mimetype in accept:
+            return fmt
+    return None
+
+
+def sse_event(event, data):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def ndjson_line(data):
+    return dumps(data) + "\n"
+
+
+def event_lines(events, fmt):
+    """Encode {"type": ..., ...} event dicts as NDJSON lines or server-sent events"""
+    for event in events:
+        if fmt == "sse":
+            yield sse_event(event.get("type", "message"), event)
+        else:
+            yield ndjson_line(event)
+
+
+def stream_response(events, fmt):
+    """Streamed Response; nothing is buffered, each event goes out as it's produced"""
+    return Response(
+        event_lines(events, fmt),
+        mimetype=STREAM_MIMETYPES[fmt],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
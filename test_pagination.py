@@ -0,0 +1,51 @@
+import base64
+import json
+
+import pytest
+
+from listing_table import ListingTable
+from pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, first_page, next_page
+from records import load_listings
+
+TABLE = ListingTable(load_listings("search_results.json"))
+
+
+def forged_cursor(**state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode().rstrip("=")
+
+
+def first_cursor():
+    page = first_page(TABLE, TABLE.rows(TABLE.all()), 5)
+    return decode_cursor(page["next_cursor"])[0]
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc", 10, 5, ("id", "price"))) == ("abc", 10, 5, ("id", "price"))
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(ValueError):
+        next_page(forged_cursor(s=first_cursor(), o=0, n=5, f=["bogus"]))
+
+
+def test_page_size_is_clamped_to_max():
+    page = next_page(forged_cursor(s=first_cursor(), o=0, n=100000, f=None))
+    assert page["page_size"] == MAX_PAGE_SIZE
+    assert len(page["results"]) == min(MAX_PAGE_SIZE, page["total"])
+
+
+def test_zero_page_size_still_advances():
+    page = next_page(forged_cursor(s=first_cursor(), o=0, n=0, f=None))
+    assert len(page["results"]) == 1
+    assert decode_cursor(page["next_cursor"])[1] == 1
+
+
+def test_negative_offset_is_rejected():
+    with pytest.raises(ValueError):
+        next_page(forged_cursor(s=first_cursor(), o=-5, n=5, f=None))
+
+
+def test_garbage_cursor_is_rejected():
+    for cursor in ("not-a-cursor", forged_cursor(s=["x"], o=0, n=5, f=None), forged_cursor(s="x", o=0, n=5, f="id")):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
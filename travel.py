@@ -1,5 +1,169 @@
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import time
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+import os
+
+from browser_pool import BrowserPoolTimeout, get_browser_pool
+from cache import TTLCache, make_cache_backend
+from singleflight import SingleFlight
+from redirects import resolve_redirect
+from resource_filter import install_resource_filter
+from readiness import (
+    STEP_TIMEOUTS,
+    PhaseTimer,
+    ResponseTracker,
+    wait_for_dom_settled,
+    wait_for_xhr_settled,
+)
+
+
+# Flight result cache configuration (override through environment variables)
+FLIGHT_CACHE_BACKEND = os.getenv("FLIGHT_CACHE_BACKEND", "memory")
+FLIGHT_CACHE_PATH = os.getenv("FLIGHT_CACHE_PATH", "flight_cache.sqlite3")
+FLIGHT_CACHE_TTL = int(os.getenv("FLIGHT_CACHE_TTL", 900))
+FLIGHT_CACHE_STALE_TTL = int(os.getenv("FLIGHT_CACHE_STALE_TTL", 3600))
+FLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("FLIGHT_CACHE_MAX_ENTRIES", 1000))
+
+flight_cache = TTLCache(
+    make_cache_backend(FLIGHT_CACHE_BACKEND, FLIGHT_CACHE_PATH, FLIGHT_CACHE_MAX_ENTRIES),
+    ttl=FLIGHT_CACHE_TTL,
+    stale_ttl=FLIGHT_CACHE_STALE_TTL,
+    name="flight-cache",
+)
+
+MOMONDO_BASE_URL = "https://momondo.com"
+
+# Upper bound on result cards extracted from one page
+MAX_FLIGHT_RESULTS = 20
+
+# Identical searches running at the same moment share one scrape
+flight_singleflight = SingleFlight()
+
+
+def build_passenger_string(
+    num_adults=1,
+    num_seniors=0,
+    num_students=0,
+    children_ages=None,
+    infants_on_seat=0,
+    infants_on_lap=0,
+):
+    """Build the passenger portion of the Momondo URL"""
+    passenger_parts = []
+    passenger_parts.append(f"{int(num_adults)}adults")
+    if int(num_seniors) > 0:
+        passenger_parts.append(f"{int(num_seniors)}seniors")
+    if int(num_students) > 0:
+        passenger_parts.append(f"{int(num_students)}students")
+
+    children_components = []
+    if int(infants_on_seat) > 0:
+        children_components.append(f"{int(infants_on_seat)}S")
+    if int(infants_on_lap) > 0:
+        children_components.append(f"{int(infants_on_lap)}L")
+    if children_ages and len(children_ages) > 0:
+        # Sorted so the same group of children always builds the same URL
+        children_components.extend([str(age) for age in sorted(int(age) for age in children_ages)])
+
+    if children_components:
+        children_str = "children-" + "-".join(children_components)
+        passenger_parts.append(children_str)
+
+    return "/".join(passenger_parts)
+
+
+def flight_search_key(leaving_airport, destination_airport, departure_date, return_date, passenger_string):
+    """Canonical cache key for a flight search"""
+    return "|".join(
+        [
+            "momondo",
+            leaving_airport.strip().upper(),
+            destination_airport.strip().upper(),
+            departure_date.strip(),
+            return_date.strip(),
+            passenger_string,
+        ]
+    )
+
+
+def _prepare_search(
+    leaving_airport,
+    destination_airport,
+    departure_date,
+    return_date,
+    num_adults=1,
+    num_seniors=0,
+    num_students=0,
+    children_ages=None,
+    infants_on_seat=0,
+    infants_on_lap=0,
+):
+    """Return the (cache key, search URL) pair for a set of search parameters"""
+    passenger_string = build_passenger_string(
+        num_adults, num_seniors, num_students, children_ages, infants_on_seat, infants_on_lap
+    )
+    leaving_airport = leaving_airport.strip().upper()
+    destination_airport = destination_airport.strip().upper()
+    url = f"https://www.momondo.com/flight-search/{leaving_airport}-{destination_airport}/{departure_date}/{return_date}/{passenger_string}?ucs=ffm4n7&sort=bestflight_a"
+    key = flight_search_key(leaving_airport, destination_airport, departure_date, return_date, passenger_string)
+    return key, url
+
+
+def _results_key(key, max_results):
+    """Cache key of a result-cards scrape, and the max_results it's clamped to"""
+    max_results = max(1, min(int(max_results), MAX_FLIGHT_RESULTS))
+    return f"{key}|results:{max_results}", max_results
+
+
+def scrape_cache_key(
+    leaving_airport,
+    destination_airport,
+    departure_date,
+    return_date,
+    num_adults=1,
+    num_seniors=0,
+    num_students=0,
+    children_ages=None,
+    infants_on_seat=0,
+    infants_on_lap=0,
+    max_results=None,
+    pool=None,
+):
+    """
+    The normalized cache key scrape_momondo uses for these parameters
+    (scrape_momondo_results when max_results is given).
+    """
+    key, _ = _prepare_search(
+        leaving_airport,
+        destination_airport,
+        departure_date,
+        return_date,
+        num_adults,
+        num_seniors,
+        num_students,
+        children_ages,
+        infants_on_seat,
+        infants_on_lap,
+    )
+    if max_results is None:
+        return key
+    return _results_key(key, max_results)[0]
+
+
+def _cached_scrape(key, scrape, pool=None):
+    """Run scrape(context) on a pooled browser behind the cache and single-flight"""
+
+    def run_scrape():
+        # Check a warm browser out of the pool instead of launching a new one
+        try:
+            return (pool or get_browser_pool()).run(scrape)
+        except BrowserPoolTimeout:
+            # Every browser is busy: not the same as a search with no results
+            raise
+        except Exception as e:
+            print(f"Error during scraping: {e}")
+            return None
+
+    # Failed scrapes (None) are never cached
+    return flight_cache.get_or_compute(key, lambda: flight_singleflight.do(key, run_scrape))
 
 
 def scrape_momondo(
@@ -13,96 +177,208 @@ def scrape_momondo(
     children_ages=None,
     infants_on_seat=0,
     infants_on_lap=0,
+    pool=None,
+):
+    key, url = _prepare_search(
+        leaving_airport,
+        destination_airport,
+        departure_date,
+        return_date,
+        num_adults,
+        num_seniors,
+        num_students,
+        children_ages,
+        infants_on_seat,
+        infants_on_lap,
+    )
+    return _cached_scrape(key, lambda context: _scrape_booking_url(context, url), pool)
+
+
+def scrape_momondo_results(
+    leaving_airport,
+    destination_airport,
+    departure_date,
+    return_date,
+    num_adults=1,
+    num_seniors=0,
+    num_students=0,
+    children_ages=None,
+    infants_on_seat=0,
+    infants_on_lap=0,
+    max_results=5,
+    pool=None,
 ):
-    with sync_playwright() as p:
-        # Set up browser with a more realistic configuration for headless mode
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            viewport={"width": 1920, "height": 1080},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
+    """
+    Scrape the top result cards from one page load.
+    Returns a list of flight records, or None if the scrape failed.
+    """
+    key, url = _prepare_search(
+        leaving_airport,
+        destination_airport,
+        departure_date,
+        return_date,
+        num_adults,
+        num_seniors,
+        num_students,
+        children_ages,
+        infants_on_seat,
+        infants_on_lap,
+    )
+    key, max_results = _results_key(key, max_results)
+    return _cached_scrape(
+        key,
+        lambda context: _scrape_result_cards(context, url, max_results),
+        pool,
+    )
+
+
+def _load_results_page(context, url, timer):
+    """Open the search page and wait until the cheapest results are showing"""
+    page = context.new_page()
+    xhr_tracker = ResponseTracker(page)
+
+    print(f"Navigating to: {url}")
+    with timer.phase("navigate"):
+        page.goto(url, timeout=STEP_TIMEOUTS["navigate"], wait_until="domcontentloaded")
+
+    # Wait for real results instead of a fixed sleep
+    print("Waiting for results to load...")
+    with timer.phase("results"):
+        page.wait_for_selector(
+            'a[href^="/book"]', timeout=STEP_TIMEOUTS["results"], state="attached"
         )
-        page = context.new_page()
-
-        # Build the passenger portion of the URL
-        passenger_parts = []
-        passenger_parts.append(f"{num_adults}adults")
-        if num_seniors > 0:
-            passenger_parts.append(f"{num_seniors}seniors")
-        if num_students > 0:
-            passenger_parts.append(f"{num_students}students")
-
-        children_components = []
-        if infants_on_seat > 0:
-            children_components.append(f"{infants_on_seat}S")
-        if infants_on_lap > 0:
-            children_components.append(f"{infants_on_lap}L")
-        if children_ages and len(children_ages) > 0:
-            children_components.extend([str(age) for age in children_ages])
-
-        if children_components:
-            children_str = "children-" + "-".join(children_components)
-            passenger_parts.append(children_str)
-
-        passenger_string = "/".join(passenger_parts)
-        url = f"https://www.momondo.com/flight-search/{leaving_airport}-{destination_airport}/{departure_date}/{return_date}/{passenger_string}?ucs=ffm4n7&sort=bestflight_a"
+    with timer.phase("xhr_settle"):
+        if not wait_for_xhr_settled(page, xhr_tracker):
+            print("Results XHRs still running, continuing anyway")
 
-        try:
-            print(f"Navigating to: {url}")
-            # Increase timeout for initial page load
-            page.goto(url, timeout=60000)
+    try:
+        # Try to click the "Cheapest" option if available
+        print("Looking for 'Cheapest' option...")
+        if page.locator('div[aria-label="Cheapest"]').count() > 0:
+            with timer.phase("sort"):
+                page.locator('div[aria-label="Cheapest"]').click(timeout=5000)
+                print("Clicked 'Cheapest' option")
+                wait_for_dom_settled(page)
+        else:
+            print("Cheapest option not found, using default sorting")
+    except Exception as e:
+        print(f"Note: Could not click Cheapest option: {e}")
+        # Continue with default sorting
 
-            # Wait longer for page to fully load
-            print("Waiting for page to load completely...")
-            time.sleep(10)
+    return page
+
+
+def _scrape_booking_url(context, url):
+    # Only the booking anchors matter, so skip images, fonts and trackers
+    resources = install_resource_filter(context)
+    timer = PhaseTimer()
+
+    try:
+        page = _load_results_page(context, url, timer)
+
+        # Find the first booking link
+        booking_links = page.locator('a[href^="/book"]')
+
+        if booking_links.count() == 0:
+            print("No booking links found!")
+            return None
 
+        href = booking_links.first.get_attribute("href")
+        print(f"Found booking link: {href}")
+
+        # Create the full URL
+        full_url = MOMONDO_BASE_URL + href
+
+        # Follow the redirect over plain HTTP, reusing the browser's cookies
+        print("Following redirect...")
+        with timer.phase("redirect"):
             try:
-                # Try to click the "Cheapest" option if available
-                print("Looking for 'Cheapest' option...")
-                if page.locator('div[aria-label="Cheapest"]').count() > 0:
-                    page.locator('div[aria-label="Cheapest"]').click(timeout=5000)
-                    print("Clicked 'Cheapest' option")
-                    time.sleep(3)
-                else:
-                    print("Cheapest option not found, using default sorting")
+                final_url = resolve_redirect(full_url, browser_cookies=context.cookies())
             except Exception as e:
-                print(f"Note: Could not click Cheapest option: {e}")
-                # Continue with default sorting
+                print(f"HTTP redirect resolution failed: {e}")
+                final_url = None
 
-            # Wait for any potential updates to complete
-            print("Looking for booking links...")
-            page.wait_for_selector('a[href^="/book"]', timeout=10000, state="attached")
+            if final_url is None:
+                # Fall back to a real page for JavaScript redirects
+                print("Falling back to browser page for redirect...")
+                new_page = context.new_page()
+                new_page.goto(full_url, timeout=60000)
 
-            # Find the first booking link
-            booking_links = page.locator('a[href^="/book"]')
+                # Wait for redirects to complete
+                print("Waiting for redirect to complete...")
+                new_page.wait_for_load_state("networkidle", timeout=30000)
+                final_url = new_page.url
 
-            if booking_links.count() == 0:
-                print("No booking links found!")
-                return None
+        print(f"Final URL after redirect: {final_url}")
 
-            href = booking_links.first.get_attribute("href")
-            print(f"Found booking link: {href}")
+        return final_url
 
-            # Create the full URL
-            full_url = "https://momondo.com" + href
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        return None
 
-            # Follow the redirect in a new page
-            print("Following redirect...")
-            new_page = context.new_page()
-            new_page.goto(full_url, timeout=60000)
+    finally:
+        print(f"Scrape timings: {timer.summary()}")
+        print(f"Scrape resources: {resources.summary()}")
+        resources.flush()
 
-            # Wait for redirects to complete
-            print("Waiting for redirect to complete...")
-            new_page.wait_for_load_state("networkidle", timeout=30000)
 
-            # Get the final URL
-            final_url = new_page.url
-            print(f"Final URL after redirect: {final_url}")
+# Pulls the top N result cards in a single round-trip to the page
+_RESULT_CARDS_JS = """
+(limit) => {
+    const results = [];
+    const seen = new Set();
+    for (const anchor of document.querySelectorAll('a[href^="/book"]')) {
+        if (results.length >= limit) break;
+        const card = anchor.closest('[data-resultid]') || anchor.closest('[role="group"]') || anchor.parentElement;
+        const id = card.getAttribute('data-resultid') || anchor.getAttribute('href');
+        if (seen.has(id)) continue;
+        seen.add(id);
 
-            # Clean up
-            browser.close()
-            return final_url
+        const text = card.innerText || '';
+        const price = text.match(/([$\u20ac\u00a3])\s?([\d,]+)/);
+        const carriers = [...new Set(
+            [...card.querySelectorAll('img[alt]')].map((img) => img.alt.trim()).filter(Boolean)
+        )];
+        results.push({
+            result_id: card.getAttribute('data-resultid'),
+            price: price ? Number(price[2].replace(/,/g, '')) : null,
+            currency: price ? price[1] : null,
+            carriers: carriers,
+            durations: text.match(/\d+h\s?\d*m?/g) || [],
+            stops: (text.match(/nonstop|direct|\d+\s+stops?/gi) || []).map((s) => s.toLowerCase()),
+            booking_href: anchor.getAttribute('href'),
+        });
+    }
+    return results;
+}
+"""
 
-        except Exception as e:
-            print(f"Error during scraping: {e}")
-            browser.close()
+
+def _scrape_result_cards(context, url, max_results):
+    resources = install_resource_filter(context)
+    timer = PhaseTimer()
+
+    try:
+        page = _load_results_page(context, url, timer)
+
+        with timer.phase("extract"):
+            cards = page.evaluate(_RESULT_CARDS_JS, max_results)
+
+        if not cards:
+            print("No result cards found!")
             return None
+
+        for card in cards:
+            card["booking_url"] = MOMONDO_BASE_URL + card.pop("booking_href")
+        print(f"Extracted {len(cards)} flight results")
+        return cards
+
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        return None
+
+    finally:
+        print(f"Scrape timings: {timer.summary()}")
+        print(f"Scrape resources: {resources.summary()}")
+        resources.flush()